@@ -0,0 +1,27 @@
+import hashlib
+
+from content_cache import ContentCache
+
+
+def normalize_text(text):
+    """Collapse whitespace so trivially different inputs share a cache entry"""
+    return " ".join(text.split())
+
+
+class AnalysisCache(ContentCache):
+    """Content-addressed cache for analysis results.
+
+    Entries live in an in-memory LRU bounded by max_entries and expire after
+    ttl seconds. With a path, results are also written to a SQLite file so
+    they survive restarts; the disk tier is bounded by max_disk_entries.
+    """
+
+    table = "analysis_cache"
+
+    def __init__(self, max_entries=256, ttl=24 * 3600, path=None, max_disk_entries=10000):
+        super().__init__(max_entries, ttl=ttl, path=path, max_disk_entries=max_disk_entries)
+
+    @staticmethod
+    def make_key(text, model_name, prompt_version):
+        payload = "\0".join([normalize_text(text), model_name, str(prompt_version)])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
@@ -0,0 +1,291 @@
+#!/usr/bin/env python3
+"""
+HTTP/JSON API for the analyzer and doctor matcher, as a plain ASGI app.
+
+    POST /analyze  {"text"}                         -> {specialty, urgency, summary}
+    POST /match    {"specialty", "price_preference", "urgency", "min_price",
+                    "max_price", "page", "page_size", "weights"}
+                                                    -> DoctorMatcher.search() result
+    POST /triage   {"text", plus any /match option} -> {"analysis", "doctors", ...}
+    GET  /health                                    -> model state and coalescing counts
+    GET  /metrics                                   -> Prometheus text (see metrics.py)
+
+Identical requests that arrive while one is already being computed wait for
+that result instead of computing it again. Each worker process holds one
+warm model (model_registry.REGISTRY); model analyses from concurrent
+requests are batched into one generate call.
+
+Usage:
+    python api_server.py --workers 4 --port 8000
+    uvicorn api_server:app --workers 4
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+from concurrent.futures import ThreadPoolExecutor
+
+from batch_queue import MicroBatcher
+from doctor_directory import ensure_snapshot
+from medical_analyzer import threads_per_worker
+from metrics import METRICS, configure_from_env
+from model_registry import REGISTRY
+
+logger = logging.getLogger(__name__)
+
+# Requests with larger bodies are rejected with 413
+MAX_BODY_BYTES = 1024 * 1024
+MATCH_OPTIONS = ("price_preference", "urgency", "min_price", "max_price", "page", "page_size", "weights")
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class Coalescer:
+    """Shares one computation between identical requests that overlap in time.
+
+    Runs inside one event loop, so no locking is needed. Results are shared
+    objects; callers must not modify them.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self.computed = 0
+        self.coalesced = 0
+
+    async def run(self, key, compute):
+        future = self._inflight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(compute())
+            self._inflight[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+            self.computed += 1
+        else:
+            self.coalesced += 1
+            METRICS.count("coalesced_requests")
+        # A caller that disconnects must not cancel the others' result
+        return await asyncio.shield(future)
+
+    def _forget(self, key, future):
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+
+    def stats(self):
+        total = self.computed + self.coalesced
+        return {
+            "computed": self.computed,
+            "coalesced": self.coalesced,
+            "in_flight": len(self._inflight),
+            "coalesced_rate": self.coalesced / total if total else 0.0,
+        }
+
+
+class ApiApp:
+    """ASGI application over the registry's shared analyzer and matcher"""
+
+    def __init__(self, registry=REGISTRY, threads=4, max_batch_size=8, max_wait_ms=20):
+        self.registry = registry
+        self.threads = threads
+        self.max_batch_size = max_batch_size
+        self.max_wait_ms = max_wait_ms
+        self.coalescer = Coalescer()
+        self._analyzer = None
+        self._matcher = None
+        self._batcher = None
+        self._executor = None
+        self._routes = {"/analyze": self.analyze, "/match": self.match, "/triage": self.triage}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    def start(self):
+        """Start warming the model and create the shared services; safe to call twice"""
+        if self._analyzer is None:
+            configure_from_env()
+            self._analyzer = self.registry.get_analyzer()
+            self._matcher = self.registry.get_matcher()
+            self._batcher = MicroBatcher(self._analyzer, self.max_batch_size, self.max_wait_ms)
+            self._executor = ThreadPoolExecutor(self.threads, thread_name_prefix="api")
+
+    def close(self):
+        if self._batcher is not None:
+            self._batcher.close()
+            self._executor.shutdown(wait=False)
+
+    async def analyze(self, body):
+        return await self._analysis(_required_text(body))
+
+    async def match(self, body):
+        specialty = body.get("specialty")
+        if not isinstance(specialty, str) or not specialty.strip():
+            raise ApiError(400, "specialty is required")
+        options = {option: body[option] for option in MATCH_OPTIONS if option in body}
+        return self._search(specialty, options)
+
+    async def triage(self, body):
+        analysis = await self._analysis(_required_text(body))
+        options = {option: body[option] for option in MATCH_OPTIONS if option in body}
+        options.setdefault("urgency", analysis["urgency"])
+        return dict(self._search(analysis["specialty"], options), analysis=analysis)
+
+    def health(self):
+        return {"model": self.registry.status(), "coalescing": self.coalescer.stats(), "pid": os.getpid()}
+
+    async def _analysis(self, text):
+        # Shared by /analyze and /triage, so the two coalesce with each other
+        return await self.coalescer.run(("analysis", text), lambda: self._analyze(text))
+
+    async def _analyze(self, text):
+        if self._analyzer.model is not None:
+            # Concurrent model requests go out as one batched generate call
+            return await asyncio.wrap_future(self._batcher.submit(text))
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._analyzer.analyze_symptoms, text)
+
+    def _search(self, specialty, options):
+        # Sub-millisecond (see doctor_ranking), so it runs on the event loop
+        try:
+            return self._matcher.search(specialty, **options)
+        except (TypeError, ValueError) as e:
+            raise ApiError(400, str(e))
+
+    async def _http(self, scope, receive, send):
+        self.start()
+        method, path = scope["method"], scope["path"]
+        content_type = b"application/json"
+        try:
+            if method == "GET" and path == "/health":
+                status, body = 200, self.health()
+            elif method == "GET" and path == "/metrics":
+                status, body = 200, METRICS.render_prometheus().encode("utf-8")
+                content_type = b"text/plain; version=0.0.4"
+            elif path not in self._routes:
+                raise ApiError(404, "not found")
+            elif method != "POST":
+                raise ApiError(405, "use POST")
+            else:
+                raw = await _read_body(receive)
+                handler = self._routes[path]
+                # Keyed on the raw body: the same JSON spelled differently only costs a recompute
+                status, body = 200, await self.coalescer.run((path, raw), lambda: handler(_parse_json(raw)))
+        except ApiError as e:
+            status, body = e.status, {"error": str(e)}
+        except Exception as e:
+            logger.exception("Request to %s failed", path)
+            status, body = 500, {"error": str(e)}
+        METRICS.count("api_requests", route=path, status=status)
+        if not isinstance(body, bytes):
+            body = json.dumps(body).encode("utf-8")
+        await _respond(send, status, body, content_type)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self.start()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+def _required_text(body):
+    text = body.get("text")
+    if not isinstance(text, str) or not text.strip():
+        raise ApiError(400, "text is required")
+    return text
+
+
+async def _read_body(receive):
+    chunks, size = [], 0
+    while True:
+        message = await receive()
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > MAX_BODY_BYTES:
+            raise ApiError(413, f"body larger than {MAX_BODY_BYTES} bytes")
+        chunks.append(chunk)
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+def _parse_json(raw):
+    try:
+        body = json.loads(raw or b"{}")
+    except ValueError:
+        raise ApiError(400, "body must be JSON")
+    if not isinstance(body, dict):
+        raise ApiError(400, "body must be a JSON object")
+    return body
+
+
+async def _respond(send, status, body, content_type=b"application/json"):
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", content_type), (b"content-length", str(len(body)).encode())],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+app = ApiApp(threads=int(os.getenv("API_THREADS", "4")))
+
+
+def __getattr__(name):
+    # Built on first use so importing api_server does not import uvicorn
+    if name == "NoDelayHttpProtocol":
+        from uvicorn.protocols.http.auto import AutoHTTPProtocol
+
+        class NoDelayHttpProtocol(AutoHTTPProtocol):
+            """uvicorn's HTTP protocol with Nagle's algorithm off on every connection.
+
+            With --workers uvicorn binds the socket itself, and asyncio only
+            sets TCP_NODELAY on sockets it created, so the separate header
+            and body writes of a response stalled ~40 ms on delayed ACKs.
+            """
+
+            def connection_made(self, transport):
+                sock = transport.get_extra_info("socket")
+                if sock is not None and sock.family in (socket.AF_INET, socket.AF_INET6):
+                    sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+                super().connection_made(transport)
+
+        globals()[name] = NoDelayHttpProtocol
+        return NoDelayHttpProtocol
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP/JSON API for analysis and doctor matching")
+    parser.add_argument("--host", default=os.getenv("API_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.getenv("API_PORT", "8000")))
+    parser.add_argument("--workers", type=int, default=int(os.getenv("API_WORKERS", "1")),
+                        help="worker processes, each with its own warm model")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING"), format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    import uvicorn
+
+    if args.workers > 1 and not os.getenv("TORCH_NUM_THREADS"):
+        os.environ["TORCH_NUM_THREADS"] = str(threads_per_worker(args.workers))
+    if REGISTRY.doctor_source and REGISTRY.doctor_snapshot_dir:
+        # Built once here, before any worker starts; each worker's
+        # get_matcher() then finds it up to date and only maps it
+        ensure_snapshot(REGISTRY.doctor_source, REGISTRY.doctor_snapshot_dir)
+    uvicorn.run("api_server:app", host=args.host, port=args.port, workers=args.workers, access_log=False,
+                http="api_server:NoDelayHttpProtocol",
+                log_level=os.getenv("LOG_LEVEL", "warning").lower())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,13 @@
+import io
+import logging
+import os
+import time
 import streamlit as st
-from medical_analyzer import MedicalAnalyzer
-from doctor_matcher import DoctorMatcher
-from document_processor import DocumentProcessor
+from metrics import configure_from_env
+from model_registry import REGISTRY
+from pipeline import PipelineBusy
+
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING"), format="%(asctime)s %(name)s %(levelname)s %(message)s")
 
 st.set_page_config(page_title="AI Doctor Finder", page_icon="🏥", layout="wide")
 
@@ -39,10 +45,93 @@ button[kind="secondary"]:hover {
 </style>
 """, unsafe_allow_html=True)
 
+# Shared per process: the model loads once in the background and the rule
+# engine answers until it is ready
 if 'analyzer' not in st.session_state:
-    st.session_state.analyzer = MedicalAnalyzer()
-    st.session_state.matcher = DoctorMatcher()
-    st.session_state.processor = DocumentProcessor()
+    # Exporters start once per process; later sessions reuse them
+    configure_from_env()
+    st.session_state.analyzer = REGISTRY.get_analyzer()
+    st.session_state.matcher = REGISTRY.get_matcher()
+    st.session_state.processor = REGISTRY.get_processor()
+    st.session_state.pipeline = REGISTRY.get_pipeline()
+
+
+def show_analysis(analysis, show_urgency=False):
+    with st.expander("🔍 View AI Model Output", expanded=False):
+        st.json(analysis)
+    
+    st.success(f"**Recommended Specialty:** {analysis['specialty']}")
+    st.info(f"**Summary:** {analysis['summary']}")
+    if show_urgency:
+        st.warning(f"**Urgency:** {analysis['urgency']}")
+
+
+def show_doctor_cards(doctors, widths, show_experience=False):
+    st.subheader("🩺 Recommended Doctors")
+    for i, doc in enumerate(doctors, 1):
+        with st.container():
+            col1, col2, col3, col4 = st.columns(widths)
+            with col1:
+                st.markdown(f"**{i}. {doc['name']}**")
+                if show_experience:
+                    st.caption(f"{doc['specialty']} • {doc['experience']} years exp")
+                else:
+                    st.caption(f"{doc['specialty']}")
+            with col2:
+                st.metric("Rating", f"⭐ {doc['rating']}")
+            with col3:
+                st.metric("Price", f"${doc['price']}")
+            with col4:
+                st.markdown(f'<div class="book-btn">✅ Book</div>', unsafe_allow_html=True)
+            st.divider()
+
+
+def show_doctor_rows(doctors):
+    st.subheader("🩺 Recommended Doctors")
+    for i, doc in enumerate(doctors, 1):
+        col1, col2 = st.columns([4, 1])
+        with col1:
+            st.markdown(f"**{i}. {doc['name']}** - {doc['specialty']} | ⭐ {doc['rating']} | ${doc['price']}")
+        with col2:
+            st.markdown(f'<div class="book-btn">✅ Book</div>', unsafe_allow_html=True)
+
+
+def run_job(text, price_pref, spinner_text, render_analysis, render_doctors, file=None, render_text=None):
+    """Submit a pipeline job (text, or a file to extract) and render its results as each stage finishes"""
+    pipeline = st.session_state.pipeline
+    try:
+        job_id = pipeline.submit(text=text, file=file, price_preference=price_pref)
+    except PipelineBusy:
+        st.error("The system is busy right now. Please try again in a moment.")
+        return
+    
+    # The work runs on the pipeline's workers; this loop only polls, showing
+    # the extracted text, then the specialty as soon as analysis is done and
+    # the doctors after
+    text_shown = analysis_shown = False
+    partial_box = st.empty()
+    with st.spinner(spinner_text):
+        while True:
+            job = pipeline.poll(job_id)
+            if render_text and job["text"] is not None and not text_shown:
+                render_text(job["text"])
+                text_shown = True
+            if job["partial"] and not job["analysis"] and job["partial"]["summary"]:
+                # Stream the summary while the model is still writing it
+                partial_box.info(f"**Summary:** {job['partial']['summary']}…")
+            if job["analysis"] and not analysis_shown:
+                partial_box.empty()
+                render_analysis(job["analysis"])
+                analysis_shown = True
+            if job["status"] in ("done", "failed"):
+                break
+            time.sleep(0.1)
+    
+    if job["status"] == "failed":
+        st.error(f"Analysis failed: {job['error']}")
+    else:
+        render_doctors(job["doctors"])
+
 
 tab1, tab2, tab3 = st.tabs(["📝 Text Input", "🎤 Voice Input", "📄 Upload Records"])
 
@@ -57,32 +146,11 @@ with tab1:
         analyze_btn = st.button("Find Doctors", type="primary")
     
     if analyze_btn and text_input:
-        with st.spinner("Analyzing your symptoms..."):
-            analysis = st.session_state.analyzer.analyze_symptoms(text_input)
-            
-            with st.expander("🔍 View AI Model Output", expanded=False):
-                st.json(analysis)
-            
-            st.success(f"**Recommended Specialty:** {analysis['specialty']}")
-            st.info(f"**Summary:** {analysis['summary']}")
-            st.warning(f"**Urgency:** {analysis['urgency']}")
-            
-            doctors = st.session_state.matcher.find_doctors(analysis['specialty'], price_pref)
-            
-            st.subheader("🩺 Recommended Doctors")
-            for i, doc in enumerate(doctors, 1):
-                with st.container():
-                    col1, col2, col3, col4 = st.columns([3, 2, 1, 1])
-                    with col1:
-                        st.markdown(f"**{i}. {doc['name']}**")
-                        st.caption(f"{doc['specialty']} • {doc['experience']} years exp")
-                    with col2:
-                        st.metric("Rating", f"⭐ {doc['rating']}")
-                    with col3:
-                        st.metric("Price", f"${doc['price']}")
-                    with col4:
-                        st.markdown(f'<div class="book-btn">✅ Book</div>', unsafe_allow_html=True)
-                    st.divider()
+        run_job(
+            text_input, price_pref, "Analyzing your symptoms...",
+            lambda analysis: show_analysis(analysis, show_urgency=True),
+            lambda doctors: show_doctor_cards(doctors, [3, 2, 1, 1], show_experience=True),
+        )
 
 with tab2:
     st.subheader("Record your symptoms")
@@ -107,24 +175,7 @@ with tab2:
             price_pref_voice = st.selectbox("Price Preference:", ["low", "medium", "high"], key="voice_price")
             
             if st.button("Analyze Voice Input", type="primary"):
-                with st.spinner("Analyzing..."):
-                    analysis = st.session_state.analyzer.analyze_symptoms(st.session_state.voice_text)
-                    
-                    with st.expander("🔍 View AI Model Output", expanded=False):
-                        st.json(analysis)
-                    
-                    st.success(f"**Recommended Specialty:** {analysis['specialty']}")
-                    st.info(f"**Summary:** {analysis['summary']}")
-                    
-                    doctors = st.session_state.matcher.find_doctors(analysis['specialty'], price_pref_voice)
-                    
-                    st.subheader("🩺 Recommended Doctors")
-                    for i, doc in enumerate(doctors, 1):
-                        col1, col2 = st.columns([4, 1])
-                        with col1:
-                            st.markdown(f"**{i}. {doc['name']}** - {doc['specialty']} | ⭐ {doc['rating']} | ${doc['price']}")
-                        with col2:
-                            st.markdown(f'<div class="book-btn">✅ Book</div>', unsafe_allow_html=True)
+                run_job(st.session_state.voice_text, price_pref_voice, "Analyzing...", show_analysis, show_doctor_rows)
     except ImportError:
         st.warning("⚠️ Voice input not available. PyAudio is not installed.")
         st.markdown("**Alternative:** Use text input or upload a document instead.")
@@ -134,41 +185,20 @@ with tab3:
     uploaded_file = st.file_uploader("Choose a file (PDF, DOCX, TXT)", type=['pdf', 'docx', 'txt'])
     
     if uploaded_file:
-        with st.spinner("Processing document..."):
-            text = st.session_state.processor.extract_text(uploaded_file)
-            if not text or len(text.strip()) < 10:
-                st.error("Could not extract text from document. Please try another file.")
-            else:
-                st.text_area("Extracted Text:", text[:500] + "...", height=150)
-        
         price_pref_doc = st.selectbox("Price Preference:", ["low", "medium", "high"], key="doc_price")
         
-        if st.button("Analyze Document", type="primary") and text and len(text.strip()) >= 10:
-            with st.spinner("Analyzing..."):
-                analysis = st.session_state.analyzer.analyze_symptoms(text)
-                
-                with st.expander("🔍 View AI Model Output", expanded=False):
-                    st.json(analysis)
-                
-                st.success(f"**Recommended Specialty:** {analysis['specialty']}")
-                st.info(f"**Summary:** {analysis['summary']}")
-                
-                doctors = st.session_state.matcher.find_doctors(analysis['specialty'], price_pref_doc)
-                
-                st.subheader("🩺 Recommended Doctors")
-                for i, doc in enumerate(doctors, 1):
-                    with st.container():
-                        col1, col2, col3, col4 = st.columns([3, 2, 2, 1])
-                        with col1:
-                            st.markdown(f"**{i}. {doc['name']}**")
-                            st.caption(f"{doc['specialty']}")
-                        with col2:
-                            st.metric("Rating", f"⭐ {doc['rating']}")
-                        with col3:
-                            st.metric("Price", f"${doc['price']}")
-                        with col4:
-                            st.markdown(f'<div class="book-btn">✅ Book</div>', unsafe_allow_html=True)
-                        st.divider()
+        if st.button("Analyze Document", type="primary"):
+            # Extraction runs on a pipeline worker, alongside other sessions'
+            # analyses; re-uploads hit the processor's cache. Each job reads
+            # its own copy, so a rerun cannot move the upload's position.
+            upload = io.BytesIO(uploaded_file.getvalue())
+            upload.name = uploaded_file.name
+            run_job(
+                None, price_pref_doc, "Processing document...", show_analysis,
+                lambda doctors: show_doctor_cards(doctors, [3, 2, 2, 1]),
+                file=upload,
+                render_text=lambda text: st.text_area("Extracted Text:", text[:500] + "...", height=150),
+            )
 
 st.sidebar.title("About")
 st.sidebar.info("""
@@ -180,6 +210,30 @@ This AI-powered system uses **MedGemma** (Google's open-source Health AI) to:
 🔒 **Privacy-First**: Runs locally, no data sent to cloud
 """)
 
+model_status = REGISTRY.status()
+st.sidebar.markdown("---")
+st.sidebar.markdown("**Model Status:**")
+if model_status["state"] == "ready":
+    st.sidebar.success(f"AI model ready (loaded in {model_status['load_seconds']:.1f}s)")
+elif model_status["state"] == "loading":
+    st.sidebar.warning("AI model warming up – using rule-based analysis")
+else:
+    st.sidebar.info("Using rule-based analysis")
+if model_status["resident_memory_mb"] is not None:
+    st.sidebar.caption(f"Memory: {model_status['resident_memory_mb']:.0f} MB resident")
+
+pipeline_stats = st.session_state.pipeline.stats()
+st.sidebar.caption(f"Queue: {pipeline_stats['queue_depth']} waiting, {pipeline_stats['running']} running")
+for stage, latency in pipeline_stats["latency"].items():
+    st.sidebar.caption(f"{stage}: {latency['mean_ms']:.0f} ms avg, {latency['p95_ms']:.0f} ms p95")
+extraction_stats = st.session_state.processor.cache.stats()
+if extraction_stats["hits"]:
+    st.sidebar.caption(f"Extraction cache: {extraction_stats['hit_rate']:.0%} hits, "
+                       f"{extraction_stats['bytes_saved'] / 1024:.0f} KB not re-parsed")
+routing_stats = st.session_state.analyzer.routing_stats()
+if routing_stats["requests"]:
+    st.sidebar.caption(f"Router: {routing_stats['escalation_rate']:.0%} of {routing_stats['requests']} requests escalated")
+
 st.sidebar.markdown("---")
 st.sidebar.markdown("**Supported Specialties:**")
 st.sidebar.caption("Cardiology • Dermatology • Neurology • Orthopedics • Gastroenterology • Endocrinology • Pulmonology • Dentistry • Ophthalmology • Psychiatry • Urology • Gynecology")
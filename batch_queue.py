@@ -0,0 +1,103 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class MicroBatcher:
+    """Collects concurrent analyze requests into batches for one generate call.
+
+    Requests are gathered until max_batch_size is reached or max_wait_ms has
+    passed since the first one arrived, then handed to
+    analyzer.analyze_symptoms_batch() together. Each request can bring its
+    own on_update callback for partial results.
+    """
+
+    def __init__(self, analyzer, max_batch_size=8, max_wait_ms=20):
+        self.analyzer = analyzer
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self._queue = queue.Queue()
+        # Guards _stopped together with enqueueing, so nothing can be queued
+        # behind the stop marker
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._worker = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._worker.start()
+
+    def submit(self, text, on_update=None):
+        """Queue a text for analysis and return a Future for its result"""
+        future = Future()
+        with self._lock:
+            if self._stopped:
+                raise RuntimeError("MicroBatcher has been closed")
+            self._queue.put((text, on_update, future))
+        return future
+
+    def analyze_symptoms(self, text, on_update=None, timeout=None):
+        """Blocking drop-in for MedicalAnalyzer.analyze_symptoms"""
+        return self.submit(text, on_update).result(timeout=timeout)
+
+    def close(self):
+        """Finish the queued requests and stop; anything left over is failed, never left pending"""
+        with self._lock:
+            if self._stopped:
+                return
+            self._stopped = True
+            self._queue.put(None)
+        self._worker.join()
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            # Futures the caller already cancelled are skipped
+            if item is not None and item[2].set_running_or_notify_cancel():
+                item[2].set_exception(RuntimeError("MicroBatcher was closed before this request ran"))
+
+    def _collect(self):
+        item = self._queue.get()
+        if item is None:
+            return None
+        batch = [item]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                self._queue.put(None)  # let the run loop see the stop marker
+                break
+            batch.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            # Drop requests cancelled while queued; the rest can no longer be
+            # cancelled, so delivering their results cannot fail
+            batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            texts = [text for text, _, _ in batch]
+            on_updates = [on_update for _, on_update, _ in batch]
+            error = RuntimeError("analyze_symptoms_batch returned too few results")
+            try:
+                if any(on_updates):
+                    results = self.analyzer.analyze_symptoms_batch(texts, on_updates)
+                else:
+                    results = self.analyzer.analyze_symptoms_batch(texts)
+                for (_, _, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                error = e
+            # Whatever went wrong only fails this batch, never the worker
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
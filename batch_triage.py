@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Headless batch triage of referral documents.
+
+Walks a directory of PDF/DOCX/TXT files (or reads a JSONL manifest of
+{"id", "path" | "text", "price_preference"} entries), extracts text,
+classifies it in batches, attaches the top doctors and streams one result
+row per document to a JSONL or CSV file as batches finish.
+
+The output file doubles as the checkpoint: rerunning the same command skips
+every document that already has a row, so an interrupted run resumes where
+it stopped. Rows that recorded an error count as done too; --retry-errors
+drops them and runs those documents again.
+
+Usage:
+    python batch_triage.py referrals/ -o results.jsonl --workers 4
+    python batch_triage.py manifest.jsonl -o results.csv --rules-only
+"""
+
+import argparse
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import sys
+import time
+
+from analysis_cache import AnalysisCache
+from doctor_directory import DoctorDirectory, MappedDoctorIndex, ensure_snapshot
+from doctor_matcher import DoctorMatcher
+from document_processor import DocumentProcessor
+from medical_analyzer import MedicalAnalyzer, DEFAULT_MODEL, MAX_INPUT_CHARS, threads_per_worker
+
+EXTENSIONS = (".pdf", ".docx", ".txt")
+CSV_COLUMNS = ["id", "source", "specialty", "urgency", "summary", "doctors", "chars", "error"]
+
+# Set in each worker process by _init_worker
+_worker = None
+
+
+def iter_directory(root):
+    """Yield an item for every supported document under root, in a stable order"""
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories.sort()
+        for name in sorted(files):
+            if name.lower().endswith(EXTENSIONS):
+                path = os.path.join(directory, name)
+                yield {"id": os.path.relpath(path, root), "path": path}
+
+
+def iter_manifest(path):
+    """Yield items from a JSONL manifest; relative paths are resolved against its directory"""
+    base = os.path.dirname(os.path.abspath(path))
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if "path" in item:
+                item["path"] = os.path.join(base, item["path"])
+                item.setdefault("id", item["path"])
+            elif "text" not in item:
+                raise ValueError(f"{path}:{line_number}: entry needs a path or text")
+            item.setdefault("id", f"line-{line_number}")
+            yield item
+
+
+def completed_ids(output, fmt, retry_errors=False):
+    """Ids already written to output. A half-written last line is cut off so appending stays valid.
+
+    Rows that recorded an error (unreadable file, no text) count as done, so
+    a rerun does not retry them. With retry_errors they are dropped from
+    output instead and their documents run again.
+    """
+    if not os.path.exists(output):
+        return set()
+    with open(output, "rb+") as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            f.truncate(end)
+    lines = data[:end].decode("utf-8").splitlines(keepends=True)
+    if fmt == "csv":
+        rows = list(zip(lines[1:], csv.DictReader(lines)))
+    else:
+        rows = [(line, json.loads(line)) for line in lines if line.strip()]
+    if retry_errors and any(row["error"] for _, row in rows):
+        rows = [(line, row) for line, row in rows if not row["error"]]
+        with open(output + ".tmp", "w", newline="", encoding="utf-8") as f:
+            f.writelines(([lines[0]] if fmt == "csv" and lines else []) + [line for line, _ in rows])
+        os.replace(output + ".tmp", output)
+    return {row["id"] for _, row in rows}
+
+
+class ResultWriter:
+    """Appends result rows to a JSONL or CSV file, flushing after every batch"""
+
+    def __init__(self, output, fmt):
+        self.fmt = fmt
+        new_file = not os.path.exists(output) or os.path.getsize(output) == 0
+        self._file = open(output, "a", newline="", encoding="utf-8")
+        if fmt == "csv":
+            self._csv = csv.DictWriter(self._file, CSV_COLUMNS)
+            if new_file:
+                self._csv.writeheader()
+
+    def write(self, rows):
+        for row in rows:
+            if self.fmt == "csv":
+                flat = dict(row, doctors="; ".join(d["name"] for d in row["doctors"]))
+                self._csv.writerow(flat)
+            else:
+                self._file.write(json.dumps(row) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class Triage:
+    """Extracts, classifies and matches one batch of items"""
+
+    def __init__(self, model_name=DEFAULT_MODEL, load_model=True, num_threads=None, doctor_source=None,
+                 doctor_snapshot_dir=None):
+        # Greedy decoding (cache attached) so reruns give the same answers
+        self.analyzer = MedicalAnalyzer(model_name, cache=AnalysisCache(), load_model=load_model,
+                                        num_threads=num_threads)
+        self.processor = DocumentProcessor()
+        directory = None
+        if doctor_snapshot_dir:
+            # Built once by the parent; every worker maps the same pages
+            directory = DoctorDirectory(MappedDoctorIndex(doctor_snapshot_dir))
+        elif doctor_source:
+            directory = DoctorDirectory.from_source(doctor_source)
+        self.matcher = DoctorMatcher(directory)
+
+    def run(self, items, default_price="medium"):
+        rows, texts = [], []
+        for item in items:
+            text, error = item.get("text"), None
+            if text is None:
+                try:
+                    with open(item["path"], "rb") as f:
+                        text = self.processor.extract_text(f, max_chars=MAX_INPUT_CHARS)
+                except OSError as e:
+                    text, error = "", str(e)
+                if not text.strip() and error is None:
+                    error = "no text extracted"
+            rows.append({"id": item["id"], "source": item.get("path", "inline"), "chars": len(text),
+                         "error": error})
+            texts.append(text)
+
+        analyzable = [i for i, row in enumerate(rows) if row["error"] is None]
+        analyses = self.analyzer.analyze_symptoms_batch([texts[i] for i in analyzable])
+        for i, analysis in zip(analyzable, analyses):
+            price = items[i].get("price_preference", default_price)
+            rows[i].update(analysis)
+            rows[i]["doctors"] = self.matcher.find_doctors(analysis["specialty"], price)
+
+        for row in rows:
+            row.setdefault("specialty", None)
+            row.setdefault("urgency", None)
+            row.setdefault("summary", None)
+            row.setdefault("doctors", [])
+        return rows
+
+
+def _init_worker(options):
+    global _worker
+    _worker = Triage(**options)
+
+
+def _run_batch(args):
+    batch, default_price = args
+    return _worker.run(batch, default_price)
+
+
+def _report(log, done, total, skipped, started, final=False):
+    elapsed = time.perf_counter() - started
+    rate = done / elapsed if elapsed > 0 else 0.0
+    remaining = total - done
+    eta = remaining / rate if rate > 0 else 0.0
+    label = "done" if final else "progress"
+    log.write(f"[{label}] {done}/{total} documents ({skipped} already done) "
+              f"{rate:.1f} docs/s, elapsed {elapsed:.0f}s, eta {eta:.0f}s\n")
+    log.flush()
+
+
+def run_triage(items, output, fmt=None, workers=1, batch_size=16, price_preference="medium",
+               model_name=DEFAULT_MODEL, load_model=True, doctor_source=None, doctor_snapshot_dir=None,
+               report_every=10.0, retry_errors=False, log=sys.stderr):
+    """Triage items into output, skipping ids already there. Returns a summary dict."""
+    fmt = fmt or ("csv" if output.endswith(".csv") else "jsonl")
+    finished = completed_ids(output, fmt, retry_errors)
+    items = list(items)
+    pending = [item for item in items if item["id"] not in finished]
+    batches = [pending[i:i + batch_size] for i in range(0, len(pending), batch_size)]
+
+    if doctor_source and doctor_snapshot_dir:
+        ensure_snapshot(doctor_source, doctor_snapshot_dir)
+    options = {
+        "model_name": model_name,
+        "load_model": load_model,
+        "num_threads": threads_per_worker(workers),
+        "doctor_source": doctor_source,
+        "doctor_snapshot_dir": doctor_snapshot_dir,
+    }
+
+    writer = ResultWriter(output, fmt)
+    started = last_report = time.perf_counter()
+    done = failed = 0
+    pool = None
+    try:
+        if workers > 1:
+            # spawn: forking a process that has already started torch threads can deadlock
+            context = multiprocessing.get_context("spawn")
+            pool = context.Pool(workers, initializer=_init_worker, initargs=(options,))
+            results = pool.imap_unordered(_run_batch, [(batch, price_preference) for batch in batches])
+        else:
+            triage = Triage(**options)
+            results = (triage.run(batch, price_preference) for batch in batches)
+
+        for rows in results:
+            writer.write(rows)
+            done += len(rows)
+            failed += sum(1 for row in rows if row["error"])
+            now = time.perf_counter()
+            if report_every is not None and now - last_report >= report_every:
+                _report(log, done, len(pending), len(items) - len(pending), started)
+                last_report = now
+        if pool is not None:
+            pool.close()
+            pool.join()
+    finally:
+        if pool is not None:
+            # No-op after a clean join; on errors and Ctrl-C it stops the
+            # workers instead of leaving them (and their models) behind
+            pool.terminate()
+        writer.close()
+
+    seconds = time.perf_counter() - started
+    if report_every is not None:
+        _report(log, done, len(pending), len(items) - len(pending), started, final=True)
+    return {
+        "processed": done,
+        "failed": failed,
+        "skipped": len(items) - len(pending),
+        "seconds": seconds,
+        "docs_per_second": done / seconds if seconds > 0 else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Batch triage of referral documents")
+    parser.add_argument("input", help="directory of PDF/DOCX/TXT files or a JSONL manifest")
+    parser.add_argument("-o", "--output", required=True, help="results file (.jsonl or .csv)")
+    parser.add_argument("--format", choices=("jsonl", "csv"), help="default: from the output extension")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes (each loads the model)")
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--price", default="medium", choices=("low", "medium", "high"),
+                        help="price preference for entries that don't set one")
+    parser.add_argument("--model", default=DEFAULT_MODEL)
+    parser.add_argument("--rules-only", action="store_true", help="skip the model, use the rule engine")
+    parser.add_argument("--report-every", type=float, default=10.0, help="seconds between progress lines")
+    parser.add_argument("--retry-errors", action="store_true",
+                        help="rerun documents whose earlier row recorded an error (by default they count as done)")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=os.getenv("LOG_LEVEL", "WARNING"), format="%(asctime)s %(name)s %(levelname)s %(message)s")
+
+    items = iter_directory(args.input) if os.path.isdir(args.input) else iter_manifest(args.input)
+    summary = run_triage(
+        items, args.output, fmt=args.format, workers=args.workers, batch_size=args.batch_size,
+        price_preference=args.price, model_name=args.model, load_model=not args.rules_only,
+        doctor_source=os.getenv("DOCTOR_DIRECTORY"), doctor_snapshot_dir=os.getenv("DOCTOR_SNAPSHOT_DIR"),
+        report_every=args.report_every, retry_errors=args.retry_errors,
+    )
+    print(json.dumps(summary))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Compare inference backends: load time, memory, tokens/sec and agreement with fp32
+Run from the repository root: python -m benchmarks.bench_backends [model_path] [--threads N]
+
+Each backend is measured in a fresh subprocess so resident memory is not
+polluted by the previous one. Inputs are the test_files/ records and the
+TEST_CASES.md scenarios.
+"""
+
+import argparse
+import glob
+import json
+import subprocess
+import sys
+import time
+
+from medical_analyzer import BACKENDS
+from specialty_router import load_test_cases
+
+
+def load_cases():
+    cases = []
+    for path in sorted(glob.glob("test_files/*.txt")):
+        with open(path, encoding="utf-8") as f:
+            cases.append(f.read())
+    cases.extend(text for text, _ in load_test_cases())
+    return cases
+
+
+def measure(model_path, backend, threads):
+    """Runs inside the subprocess: load one backend and analyze every case"""
+    from medical_analyzer import MedicalAnalyzer
+    from model_registry import resident_memory_mb
+
+    memory_before = resident_memory_mb()
+    start = time.perf_counter()
+    analyzer = MedicalAnalyzer(model_name=model_path, backend=backend, num_threads=threads)
+    load_seconds = time.perf_counter() - start
+    if analyzer.model is None:
+        return {"backend": backend, "error": analyzer.load_error}
+    analyzer.do_sample = False  # greedy, so backends are comparable
+
+    specialties = []
+    start = time.perf_counter()
+    for case in load_cases():
+        specialties.append(analyzer.analyze_symptoms(case)["specialty"])
+    generate_seconds = time.perf_counter() - start
+    stats = analyzer.generation_stats()
+    return {
+        "backend": backend,
+        "load_seconds": load_seconds,
+        # nan where the platform cannot report resident memory
+        "memory_mb": resident_memory_mb() - memory_before if memory_before is not None else float("nan"),
+        "tokens_per_second": stats["mean_tokens"] * stats["requests"] / generate_seconds,
+        "specialties": specialties,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("model_path", nargs="?", help="model to load (default: tiny local stand-in)")
+    parser.add_argument("--threads", type=int, help="torch intra-op threads")
+    parser.add_argument("--backend", choices=BACKENDS, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.backend:
+        print(json.dumps(measure(args.model_path, args.backend, args.threads)))
+        return
+
+    if not args.model_path:
+        from benchmarks.tiny_model import build_tiny_model
+        args.model_path = build_tiny_model()
+
+    results = {}
+    for backend in ("fp32",) + tuple(b for b in BACKENDS if b != "fp32"):
+        command = [sys.executable, "-m", "benchmarks.bench_backends", args.model_path, "--backend", backend]
+        if args.threads:
+            command += ["--threads", str(args.threads)]
+        output = subprocess.run(command, capture_output=True, text=True, check=True).stdout
+        results[backend] = json.loads(output.strip().splitlines()[-1])
+
+    baseline = results["fp32"].get("specialties")
+    print(f"{'backend':<8} {'load s':>8} {'memory MB':>10} {'tokens/s':>10} {'agreement':>10}")
+    for backend, result in results.items():
+        if "error" in result:
+            print(f"{backend:<8} failed: {result['error']}")
+            continue
+        agreement = sum(a == b for a, b in zip(result["specialties"], baseline)) / len(baseline)
+        print(f"{backend:<8} {result['load_seconds']:8.2f} {result['memory_mb']:10.1f} "
+              f"{result['tokens_per_second']:10.1f} {agreement:10.0%}")
+
+
+if __name__ == "__main__":
+    main()
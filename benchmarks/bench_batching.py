@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Throughput and latency of one-at-a-time generation vs the micro-batching queue
+Run from the repository root: python -m benchmarks.bench_batching [model_path]
+
+Without a model path a tiny random stand-in model is used (see tiny_model.py),
+which exercises the same tokenize/generate/parse path on CPU.
+"""
+
+import statistics
+import sys
+import threading
+import time
+
+from batch_queue import MicroBatcher
+from benchmarks.tiny_model import build_tiny_model
+from medical_analyzer import MedicalAnalyzer
+
+SAMPLE_TEXTS = [
+    "I've been having severe chest pain and difficulty breathing for 3 days.",
+    "I have itchy red rashes on my arms and legs that won't go away.",
+    "Severe lower back pain shooting down my right leg after lifting heavy objects.",
+    "Constant severe headaches with blurred vision and sensitivity to light.",
+    "Persistent stomach pain, bloating, and irregular bowel movements for 2 weeks.",
+    "Excessive thirst, frequent urination and constant fatigue for the past month.",
+    "Chronic cough with wheezing and shortness of breath especially at night.",
+    "My tooth hurts when I drink something cold and my gum is swollen.",
+]
+
+
+def run_clients(call, clients, requests_per_client):
+    """Fire requests from concurrent client threads; return (wall time, latencies)"""
+    latencies = []
+    lock = threading.Lock()
+
+    def client(offset):
+        for i in range(requests_per_client):
+            text = SAMPLE_TEXTS[(offset + i) % len(SAMPLE_TEXTS)]
+            start = time.perf_counter()
+            call(text)
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+
+    threads = [threading.Thread(target=client, args=(c,)) for c in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return time.perf_counter() - start, latencies
+
+
+def report(name, wall, latencies):
+    latencies = sorted(latencies)
+    p50 = statistics.median(latencies)
+    p95 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))]
+    print(f"{name:<28} {len(latencies) / wall:8.2f} req/s   p50 {p50 * 1000:8.1f} ms   p95 {p95 * 1000:8.1f} ms")
+
+
+def main(model_path=None, clients=8, requests_per_client=4, max_batch_size=8, max_wait_ms=20):
+    analyzer = MedicalAnalyzer(model_name=model_path or build_tiny_model())
+    if analyzer.model is None:
+        sys.exit("Model failed to load")
+
+    # The current path: every request runs its own generate, one at a time
+    model_lock = threading.Lock()
+
+    def one_at_a_time(text):
+        with model_lock:
+            return analyzer.analyze_symptoms(text)
+
+    print(f"{clients} concurrent clients x {requests_per_client} requests, "
+          f"max_batch_size={max_batch_size}, max_wait_ms={max_wait_ms}")
+    sequential = run_clients(one_at_a_time, clients, requests_per_client)
+    batcher = MicroBatcher(analyzer, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+    batched = run_clients(batcher.analyze_symptoms, clients, requests_per_client)
+    batcher.close()
+    report("one-at-a-time", *sequential)
+    report("micro-batched", *batched)
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+DoctorIndex top-k queries vs the old filter-and-sort over the DOCTORS list
+Run from the repository root: python -m benchmarks.bench_doctor_index
+"""
+
+import sys
+import time
+import timeit
+
+from benchmarks.synthetic import SPECIALTIES, synthetic_doctors
+from doctor_index import DoctorIndex
+from doctors_db import DOCTORS
+
+PREFERENCES = ["low", "medium", "high"]
+
+
+def legacy_find(doctors, specialty, price_preference):
+    """The original DoctorMatcher.find_doctors without logging"""
+    matches = [d for d in doctors if d["specialty"].lower() == specialty.lower()]
+    if not matches:
+        all_doctors = doctors.copy()
+        all_doctors.sort(key=lambda x: (-x["rating"], x["price"]))
+        return all_doctors[:3]
+    matches.sort(key=lambda x: (-x["rating"], x["price"]))
+    if price_preference == "low":
+        matches.sort(key=lambda x: (x["price"], -x["rating"]))
+    elif price_preference == "high":
+        matches.sort(key=lambda x: (-x["rating"], -x["experience"]))
+    return matches[:3]
+
+
+def bench(label, doctors):
+    start = time.perf_counter()
+    index = DoctorIndex(doctors)
+    build = time.perf_counter() - start
+
+    queries = [(s, p) for s in SPECIALTIES for p in PREFERENCES]
+    number = max(1, 20000 // len(doctors))
+    legacy = timeit.timeit(lambda: [legacy_find(doctors, s, p) for s, p in queries], number=number)
+    indexed = timeit.timeit(lambda: [index.top(s, p) for s, p in queries], number=number * 100)
+
+    inserts = synthetic_doctors(1000, seed=1)
+    for doctor in inserts:
+        doctor["name"] += " (new)"
+    start = time.perf_counter()
+    for doctor in inserts:
+        index.add(doctor)
+    insert = (time.perf_counter() - start) / len(inserts)
+
+    per_query = len(queries)
+    print(f"{label:>10}: build {build * 1000:9.1f} ms | "
+          f"linear scan {legacy / number / per_query * 1e6:11.1f} us/query | "
+          f"index {indexed / (number * 100) / per_query * 1e6:6.2f} us/query | "
+          f"insert {insert * 1e6:7.1f} us")
+
+
+def main(sizes=(10_000, 1_000_000)):
+    bench("25 (db)", DOCTORS)
+    for n in sizes:
+        bench(f"{n:,}", synthetic_doctors(n))
+
+
+if __name__ == "__main__":
+    main(tuple(int(a) for a in sys.argv[1:]) or (10_000, 1_000_000))
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""
+Weighted doctor search: vectorized scoring with partial top-k vs a full sort
+Run from the repository root: python -m benchmarks.bench_doctor_search [sizes...]
+
+Each query is timed on the in-memory index and on a memory-mapped snapshot
+of the same doctors. The first five page through the presorted orderings;
+the "balanced" and custom-weights ones score the rating order chunk by
+chunk until nobody further down can make the page. "full sort" scores
+every doctor of the specialty and argsorts them all, which is what both
+avoid.
+"""
+
+import sys
+import tempfile
+import timeit
+
+import numpy as np
+
+from benchmarks.synthetic import synthetic_doctors
+from doctor_directory import DoctorDirectory, MappedDoctorIndex, build_snapshot
+from doctor_index import DoctorIndex
+from doctor_matcher import DoctorMatcher
+from doctor_ranking import ranking_weights, score
+
+QUERIES = {
+    "top 3": dict(specialty="Cardiology"),
+    "price 100-150": dict(specialty="Cardiology", min_price=100, max_price=150),
+    "page 10 of 20": dict(specialty="Cardiology", page=10, page_size=20),
+    "related fallback": dict(specialty="Rheumatology", max_price=55),
+    "any fallback": dict(specialty="Astrology"),
+    "balanced urgent": dict(specialty="Cardiology", price_preference="balanced", urgency="High"),
+    "custom weights": dict(specialty="Neurology", weights={"experience": 1.0, "price": 0.2}),
+    "balanced any": dict(specialty="Astrology", price_preference="balanced"),
+}
+
+
+def full_sort(index, specialty, k=3):
+    columns = index.columns(specialty)
+    scores = score(columns, ranking_weights(), None, index.max_price, index.max_experience)
+    return columns.ids[np.argsort(-scores, kind="stable")[:k]]
+
+
+def per_query_us(func, number):
+    return timeit.timeit(func, number=number) / number * 1e6
+
+
+def bench(size, number=200):
+    doctors = synthetic_doctors(size)
+    with tempfile.TemporaryDirectory() as root:
+        build_snapshot(doctors, root)
+        indexes = {"memory": DoctorIndex(doctors), "mmap": MappedDoctorIndex(root)}
+        print(f"\n{size:,} doctors, us per query")
+        print(f"{'query':<18} {'memory':>9} {'mmap':>9}")
+        for name, query in QUERIES.items():
+            timings = []
+            for index in indexes.values():
+                matcher = DoctorMatcher(DoctorDirectory(index))
+                matcher.search(**query)
+                timings.append(per_query_us(lambda: matcher.search(**query), number))
+            print(f"{name:<18} {timings[0]:9.1f} {timings[1]:9.1f}")
+        index = indexes["memory"]
+        print(f"{'full sort (top 3)':<18} {per_query_us(lambda: full_sort(index, 'Cardiology'), number):9.1f}")
+
+
+def main(sizes=(10_000, 1_000_000)):
+    for size in sizes:
+        bench(size)
+
+
+if __name__ == "__main__":
+    main(tuple(int(a) for a in sys.argv[1:]) or (10_000, 1_000_000))
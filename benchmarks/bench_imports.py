@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Import-time profile of the app's modules, from a fresh interpreter run with -X importtime
+Run from the repository root: python -m benchmarks.bench_imports [module ...] [--top N]
+
+Prints the total import time and the slowest modules by cumulative time
+(the module plus everything it imported first). Defaults to the modules
+app.py imports, minus streamlit.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+APP_MODULES = ("medical_analyzer", "metrics", "model_registry", "pipeline")
+# Imported on first use of the model or document paths, never at startup
+HEAVY_MODULES = ("torch", "transformers", "PyPDF2", "docx")
+
+
+def import_profile(modules=APP_MODULES, env=None):
+    """[(module, self microseconds, cumulative microseconds, depth)] for one cold import of modules.
+
+    Modules the bare interpreter already imports at startup (site, encodings)
+    are left out.
+    """
+    startup = {name for name, _, _, _ in _importtime("pass", env)}
+    return [row for row in _importtime("; ".join(f"import {m}" for m in modules), env) if row[0] not in startup]
+
+
+def _importtime(code, env):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        capture_output=True, text=True, env=env, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        # Nesting is shown as two extra spaces per level before the name
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def total_seconds(rows):
+    """Time spent importing: the sum over top-level modules"""
+    return sum(cumulative for _, _, cumulative, depth in rows if depth == 0) / 1e6
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Import-time profile")
+    parser.add_argument("modules", nargs="*", default=APP_MODULES)
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args(argv)
+
+    rows = import_profile(args.modules)
+    print(f"Importing {', '.join(args.modules)}: {total_seconds(rows) * 1000:.0f} ms, {len(rows)} modules")
+    heavy = [name for name, _, _, _ in rows if name in HEAVY_MODULES]
+    print(f"Heavy modules imported: {', '.join(heavy) or 'none'}\n")
+    print(f"{'cumulative ms':>13} {'self ms':>8}  module")
+    for name, self_us, cumulative_us, _ in sorted(rows, key=lambda row: -row[2])[:args.top]:
+        print(f"{cumulative_us / 1000:13.1f} {self_us / 1000:8.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Prefill latency with and without the reused prompt-header KV cache
+Run from the repository root: python -m benchmarks.bench_prefix_cache [model_path]
+
+For each input length the full prompt is prefilled from scratch, then again
+with a copy of the precomputed PROMPT_PREFIX cache (copy included in the
+timing, as in a real request). Also checks that greedy answers match.
+"""
+
+import sys
+import time
+
+import torch
+
+from benchmarks.synthetic import synthetic_text
+from benchmarks.tiny_model import build_tiny_model
+from medical_analyzer import MedicalAnalyzer
+
+LENGTHS = (50, 500, 1000, 2000, 5000)
+REPEATS = 20
+
+
+def prefill_ms(analyzer, input_ids, reuse):
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        with torch.no_grad():
+            if reuse:
+                past_key_values = analyzer._prefix_past(input_ids)
+                # Only the tokens after the cached header are run, as generate() does
+                analyzer.model(input_ids=input_ids[:, past_key_values.get_seq_length():],
+                               past_key_values=past_key_values, use_cache=True)
+            else:
+                analyzer.model(input_ids=input_ids, use_cache=True)
+        timings.append(time.perf_counter() - start)
+    return sorted(timings)[len(timings) // 2] * 1000
+
+
+def main(model_path=None):
+    analyzer = MedicalAnalyzer(model_name=model_path or build_tiny_model())
+    if analyzer.model is None:
+        sys.exit("Model failed to load")
+    analyzer.do_sample = False
+
+    prefix_tokens = len(analyzer._prefix[0])
+    print(f"prompt header: {prefix_tokens} tokens")
+    print(f"{'chars':>6} {'tokens':>7} {'full ms':>9} {'reused ms':>10} {'speedup':>8}  same answer")
+    for length in LENGTHS:
+        text = analyzer._prepare_input(synthetic_text(length, seed=length))
+        inputs = analyzer.tokenizer(analyzer._build_prompt(text), return_tensors="pt",
+                                    max_length=1024, truncation=True).to(analyzer.model.device)
+        input_ids = inputs["input_ids"]
+        if analyzer._prefix_past(input_ids) is None:
+            print(f"{length:>6} prompt does not start with the cached header tokens")
+            continue
+        full = prefill_ms(analyzer, input_ids, reuse=False)
+        reused = prefill_ms(analyzer, input_ids, reuse=True)
+
+        analyzer.reuse_prefix = False
+        without = analyzer.analyze_symptoms(text)
+        analyzer.reuse_prefix = True
+        with_reuse = analyzer.analyze_symptoms(text)
+        print(f"{length:>6} {input_ids.shape[1]:>7} {full:9.2f} {reused:10.2f} {full / reused:7.2f}x  "
+              f"{'yes' if without == with_reuse else 'NO'}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Semantic router: accuracy vs escalation rate, routing latency, engine time saved
+Run from the repository root: python -m benchmarks.bench_router [model_path]
+
+Accuracy is leave-one-out over TEST_CASES.md: each case is routed by a
+router built from the keyword table and the other cases. The saved-time
+section runs TEST_CASES.md through an analyzer with the router in front of
+the model (the tiny stand-in model unless a path is given).
+"""
+
+import sys
+import timeit
+
+from medical_analyzer import MedicalAnalyzer
+from specialty_router import SpecialtyRouter, load_test_cases
+
+THRESHOLDS = (0.0, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9)
+
+
+def leave_one_out(cases):
+    """(confidence, correct) for every case routed without itself as an example"""
+    outcomes = []
+    for i, (text, specialty) in enumerate(cases):
+        router = SpecialtyRouter(examples=cases[:i] + cases[i + 1:])
+        result = router.route(text)
+        outcomes.append((result["confidence"], result["specialty"] == specialty))
+    return outcomes
+
+
+def main(model_path=None, number=2000):
+    cases = load_test_cases()
+    outcomes = leave_one_out(cases)
+    print(f"Leave-one-out over {len(cases)} cases")
+    print(f"{'threshold':>9} {'answered':>9} {'accuracy':>9} {'escalated':>10}")
+    for threshold in THRESHOLDS:
+        answered = [correct for confidence, correct in outcomes if confidence >= threshold]
+        accuracy = sum(answered) / len(answered) if answered else float("nan")
+        print(f"{threshold:9.1f} {len(answered):9d} {accuracy:9.0%} {1 - len(answered) / len(cases):10.0%}")
+
+    router = SpecialtyRouter(examples=cases)
+    texts = [text for text, _ in cases]
+    single = timeit.timeit(lambda: [router.route(text) for text in texts], number=number // 10)
+    batched = timeit.timeit(lambda: router.route_many(texts), number=number // 10)
+    per_text = len(texts) * number // 10
+    print(f"\nRouting latency: {single / per_text * 1e6:.1f} us/text single, "
+          f"{batched / per_text * 1e6:.1f} us/text batched")
+
+    from benchmarks.tiny_model import build_tiny_model
+
+    analyzer = MedicalAnalyzer(model_name=model_path or build_tiny_model(), router=router)
+    if analyzer.model is None:
+        raise RuntimeError(f"Model failed to load: {analyzer.load_error}")
+    analyzer.do_sample = False
+    # Unseen phrasings next to the labelled cases so some requests escalate
+    for text in texts + ["feeling unwell for a few days", "follow-up visit requested", "general checkup"]:
+        analyzer.analyze_symptoms(text)
+    stats = analyzer.routing_stats()
+    print(f"\nWith the router in front of the model ({stats['requests']} requests):")
+    print(f"  escalation rate     {stats['escalation_rate']:.0%}")
+    print(f"  routing             {stats['mean_route_ms']:.3f} ms/request")
+    print(f"  escalated analysis  {stats['mean_escalated_ms']:.1f} ms/request")
+    print(f"  saved               {stats['saved_ms_per_request']:.1f} ms/request")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Microbenchmark: compiled keyword classifier vs the old if/elif keyword chain
+Run from the repository root: python -m benchmarks.bench_rules
+
+The two can disagree: the chain matched keywords anywhere ("heart" in
+"sweetheart"), the classifier only at the start of a word.
+"""
+
+import glob
+import timeit
+
+from specialty_rules import RULE_CLASSIFIER, SPECIALTY_RULES, DEFAULT_RESULT
+
+
+def legacy_classify(text):
+    """The original chained any(word in text_lower ...) scans"""
+    text_lower = text.lower()
+    for specialty, urgency, summary, keywords in SPECIALTY_RULES:
+        if any(word in text_lower for word in keywords):
+            return {"specialty": specialty, "urgency": urgency, "summary": summary}
+    return dict(DEFAULT_RESULT)
+
+
+def load_corpus():
+    texts = []
+    for path in sorted(glob.glob("test_files/*.txt")):
+        with open(path, encoding="utf-8") as f:
+            texts.append(f.read()[:5000])
+    return texts
+
+
+# Inputs the chain handles worst: a hit only in the last specialty, or no hit at all
+WORST_CASES = {
+    "late match (5000 chars)": ("Patient reports feeling generally unwell for weeks. " * 100)[:4950] + " pelvic pain",
+    "no match (5000 chars)": ("Patient reports feeling generally unwell for weeks. " * 100)[:5000],
+}
+
+
+def main(number=2000):
+    corpus = load_corpus()
+    print(f"Corpus: {len(corpus)} documents, {sum(len(t) for t in corpus)} characters")
+
+    legacy = timeit.timeit(lambda: [legacy_classify(t) for t in corpus], number=number)
+    compiled = timeit.timeit(lambda: [RULE_CLASSIFIER.classify(t) for t in corpus], number=number)
+    batch = timeit.timeit(lambda: RULE_CLASSIFIER.analyze_many(corpus), number=number)
+
+    per_doc = number * len(corpus)
+    print(f"if/elif chain:      {legacy / per_doc * 1e6:8.2f} us/doc")
+    print(f"compiled classify:  {compiled / per_doc * 1e6:8.2f} us/doc")
+    print(f"analyze_many:       {batch / per_doc * 1e6:8.2f} us/doc")
+
+    for name, text in WORST_CASES.items():
+        legacy = timeit.timeit(lambda: legacy_classify(text), number=number // 4)
+        compiled = timeit.timeit(lambda: RULE_CLASSIFIER.classify(text), number=number // 4)
+        print(f"{name}: if/elif {legacy / (number // 4) * 1e6:8.2f} us, compiled {compiled / (number // 4) * 1e6:8.2f} us")
+
+    print("\nPer-document results (legacy -> compiled):")
+    for path, text in zip(sorted(glob.glob("test_files/*.txt")), corpus):
+        print(f"  {path}: {legacy_classify(text)['specialty']} -> {RULE_CLASSIFIER.classify(text)['specialty']}"
+              f"  scores={RULE_CLASSIFIER.score(text)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Streaming generation with early stop vs full generation + whole-output decode
+Run from the repository root: python -m benchmarks.bench_streaming [model_path]
+"""
+
+import sys
+import time
+
+from benchmarks.bench_batching import SAMPLE_TEXTS
+from benchmarks.tiny_model import build_tiny_model
+from medical_analyzer import MedicalAnalyzer
+
+
+def full_generation(analyzer, text):
+    """The previous path: generate to EOS or the cap, decode prompt and answer together"""
+    prompt = analyzer._build_prompt(analyzer._prepare_input(text))
+    inputs = analyzer.tokenizer(prompt, return_tensors="pt", max_length=1024, truncation=True).to(analyzer.model.device)
+    outputs = analyzer.model.generate(**inputs, **analyzer._generation_kwargs())
+    response = analyzer.tokenizer.decode(outputs[0], skip_special_tokens=True)
+    return analyzer._parse_response(response), outputs.shape[1] - inputs["input_ids"].shape[1]
+
+
+def main(model_path=None):
+    analyzer = MedicalAnalyzer(model_name=model_path or build_tiny_model())
+    if analyzer.model is None:
+        sys.exit("Model failed to load")
+    analyzer.do_sample = False  # same greedy output on both paths
+
+    full_tokens, full_time, stream_time, agree = 0, 0.0, 0.0, 0
+    for text in SAMPLE_TEXTS:
+        start = time.perf_counter()
+        full_result, tokens = full_generation(analyzer, text)
+        full_time += time.perf_counter() - start
+        full_tokens += tokens
+
+        start = time.perf_counter()
+        stream_result = analyzer.analyze_symptoms(text)
+        stream_time += time.perf_counter() - start
+        agree += stream_result["specialty"] == full_result["specialty"]
+
+    stats = analyzer.generation_stats()
+    n = len(SAMPLE_TEXTS)
+    print(f"full generation:   {full_tokens / n:6.1f} tokens/request   {full_time / n * 1000:8.1f} ms/request")
+    print(f"streaming + stop:  {stats['mean_tokens']:6.1f} tokens/request   {stream_time / n * 1000:8.1f} ms/request")
+    print(f"tokens saved:      {full_tokens / n - stats['mean_tokens']:6.1f} per request "
+          f"(early stop on {stats['early_stop_rate']:.0%} of requests)")
+    if stats["mean_time_to_first_field_ms"] is not None:
+        print(f"time to first field: {stats['mean_time_to_first_field_ms']:.1f} ms")
+    print(f"specialty agreement: {agree}/{n}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1] if len(sys.argv) > 1 else None)
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Load generator for api_server: requests/sec and tail latency
+Run from the repository root:
+
+    python -m benchmarks.load_api --spawn --workers 2 --endpoint triage --concurrency 32 --duration 10
+    python -m benchmarks.load_api --url http://127.0.0.1:8000 --endpoint analyze --duplicates 0.5
+
+Each of --concurrency connections sends requests back to back over one
+keep-alive HTTP/1.1 connection for --duration seconds. A --duplicates
+fraction of request bodies come from a small hot set of texts so identical
+requests overlap and get coalesced; the rest are unique. --spawn starts a
+local instance (python api_server.py) on a free port first.
+"""
+
+import argparse
+import asyncio
+import json
+import random
+import socket
+import subprocess
+import sys
+import time
+import urllib.request
+from urllib.parse import urlsplit
+
+from specialty_router import load_test_cases
+
+HOT_SET = 8
+
+
+def request_bodies(endpoint, duplicates, seed=0):
+    """Endless JSON bodies for endpoint, duplicates of them drawn from a hot set"""
+    rng = random.Random(seed)
+    texts = [text for text, _ in load_test_cases()]
+    specialties = sorted({specialty for _, specialty in load_test_cases()})
+    counter = 0
+    while True:
+        counter += 1
+        hot = rng.random() < duplicates
+        if endpoint == "match":
+            body = {"specialty": rng.choice(specialties), "urgency": rng.choice(["Low", "High"])}
+            body["page"] = rng.randint(1, 2) if hot else counter
+        else:
+            text = texts[counter % HOT_SET] if hot else f"{rng.choice(texts)} (visit {counter})"
+            body = {"text": text}
+        yield json.dumps(body).encode("utf-8")
+
+
+async def _connection(host, port, path, bodies, deadline, latencies, errors):
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        while time.perf_counter() < deadline:
+            body = next(bodies)
+            start = time.perf_counter()
+            writer.write(b"POST %s HTTP/1.1\r\nHost: %s\r\nContent-Type: application/json\r\n"
+                         b"Content-Length: %d\r\n\r\n%s" % (path.encode(), host.encode(), len(body), body))
+            status_line = await reader.readline()
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.partition(b":")
+                if name.strip().lower() == b"content-length":
+                    length = int(value)
+            await reader.readexactly(length)
+            latencies.append(time.perf_counter() - start)
+            if not status_line.startswith(b"HTTP/1.1 200"):
+                errors.append(status_line.decode().strip())
+    finally:
+        writer.close()
+
+
+async def run_load(url, endpoint, concurrency, duration, duplicates):
+    parts = urlsplit(url)
+    bodies = request_bodies(endpoint, duplicates)
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _connection(parts.hostname, parts.port or 80, f"/{endpoint}", bodies, deadline, latencies, errors)
+        for _ in range(concurrency)
+    ))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+def summarize(latencies, errors, seconds):
+    ordered = sorted(latencies)
+
+    def percentile(p):
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000 if ordered else 0.0
+
+    return {
+        "requests": len(ordered),
+        "errors": len(errors),
+        "seconds": seconds,
+        "requests_per_second": len(ordered) / seconds if seconds > 0 else 0.0,
+        "p50_ms": percentile(0.50),
+        "p90_ms": percentile(0.90),
+        "p99_ms": percentile(0.99),
+        "max_ms": ordered[-1] * 1000 if ordered else 0.0,
+    }
+
+
+def spawn_server(workers):
+    """Start api_server.py on a free port; returns (process, url) once it answers /health"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    process = subprocess.Popen([sys.executable, "api_server.py", "--port", str(port), "--workers", str(workers)])
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(url + "/health", timeout=1).read()
+            return process, url
+        except OSError:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError("api_server did not start within 60s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load generator for api_server")
+    parser.add_argument("--url", default="http://127.0.0.1:8000")
+    parser.add_argument("--spawn", action="store_true", help="start a local api_server first")
+    parser.add_argument("--workers", type=int, default=1, help="worker processes for --spawn")
+    parser.add_argument("--endpoint", choices=("analyze", "match", "triage"), default="triage")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--duplicates", type=float, default=0.3,
+                        help="fraction of requests drawn from a small hot set (default 0.3)")
+    args = parser.parse_args(argv)
+
+    process = None
+    url = args.url
+    if args.spawn:
+        process, url = spawn_server(args.workers)
+    try:
+        result = asyncio.run(run_load(url, args.endpoint, args.concurrency, args.duration, args.duplicates))
+        # Coalescing counts of whichever worker answers; each worker keeps its own
+        health = json.loads(urllib.request.urlopen(url + "/health").read())
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+    print(f"{args.endpoint}: {args.concurrency} connections, {args.duration:.0f}s, {args.duplicates:.0%} duplicates")
+    print(f"  {result['requests']} requests, {result['errors']} errors, "
+          f"{result['requests_per_second']:.0f} req/s")
+    print(f"  latency p50 {result['p50_ms']:.2f} ms | p90 {result['p90_ms']:.2f} ms | "
+          f"p99 {result['p99_ms']:.2f} ms | max {result['max_ms']:.2f} ms")
+    print(f"  one worker's coalescing: {health['coalescing']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,100 @@
+"""Synthetic fixtures shared by the benchmarks"""
+
+import random
+
+from specialty_rules import SPECIALTY_RULES
+
+SPECIALTIES = [specialty for specialty, _, _, _ in SPECIALTY_RULES] + ["Rheumatology", "General Medicine"]
+
+FIRST_NAMES = ["Sarah", "Michael", "Emily", "James", "Lisa", "David", "Maria", "Robert", "Jennifer", "William"]
+LAST_NAMES = ["Johnson", "Chen", "Rodriguez", "Wilson", "Anderson", "Kim", "Garcia", "Taylor", "Lee", "Brown"]
+
+
+def synthetic_doctors(n, seed=0):
+    """n doctor dicts shaped like doctors_db.DOCTORS, with unique names"""
+    rng = random.Random(seed)
+    return [
+        {
+            "name": f"Dr. {rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)} #{i}",
+            "specialty": rng.choice(SPECIALTIES),
+            "rating": round(rng.uniform(3.5, 5.0), 1),
+            "price": rng.randrange(50, 301, 5),
+            "experience": rng.randint(1, 40),
+        }
+        for i in range(n)
+    ]
+
+
+SYMPTOM_SENTENCES = [
+    "Patient reports intermittent chest pain radiating to the left arm.",
+    "Itchy red rash on both forearms, worse at night.",
+    "Lower back pain after lifting, with stiffness in the morning.",
+    "Recurring headaches with sensitivity to light and mild nausea.",
+    "Persistent stomach pain and bloating after meals.",
+    "Fatigue, excessive thirst and frequent urination for several weeks.",
+    "Dry cough and shortness of breath when climbing stairs.",
+    "Blurry vision in the right eye when reading.",
+    "Vital signs within normal limits. No known drug allergies.",
+    "Follow-up recommended in two weeks; continue current medication.",
+]
+
+
+def synthetic_text(chars, seed=0):
+    """Clinical-sounding filler text of roughly the given length"""
+    rng = random.Random(seed)
+    parts, length = [], 0
+    while length < chars:
+        sentence = rng.choice(SYMPTOM_SENTENCES)
+        parts.append(sentence)
+        length += len(sentence) + 1
+    return " ".join(parts)[:chars]
+
+
+def _pdf_escape(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def synthetic_pdf(pages, lines_per_page=40, seed=0):
+    """Bytes of a text PDF with the given number of pages, no PDF library needed"""
+    rng = random.Random(seed)
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    page_ids = []
+    for page in range(pages):
+        lines = [f"Page {page + 1}"] + [rng.choice(SYMPTOM_SENTENCES) for _ in range(lines_per_page)]
+        stream = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(f"({_pdf_escape(line)}) '" for line in lines) + " ET"
+        stream = stream.encode("latin-1")
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(stream), stream))
+        content_id = len(objects)
+        objects.append(
+            b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % content_id
+        )
+        page_ids.append(len(objects))
+    kids = b" ".join(b"%d 0 R" % i for i in page_ids)
+    objects[1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+def synthetic_docx(paragraphs, seed=0):
+    """Bytes of a DOCX document with the given number of paragraphs"""
+    import io
+    import docx
+
+    rng = random.Random(seed)
+    document = docx.Document()
+    for _ in range(paragraphs):
+        document.add_paragraph(" ".join(rng.choice(SYMPTOM_SENTENCES) for _ in range(3)))
+    buffer = io.BytesIO()
+    document.save(buffer)
+    return buffer.getvalue()
@@ -0,0 +1,116 @@
+"""
+Tiny stand-in for the Gemma analyzer model.
+
+Builds a word-level tokenizer and a two-layer Llama-style causal LM, briefly
+trains it to answer the analyzer prompt in the SPECIALTY/URGENCY/SUMMARY
+format (labels come from the rule engine), and saves both to a local
+directory. MedicalAnalyzer loads it through the usual from_pretrained() path
+without network access or a multi-GB download. Its answers are not medically
+meaningful; it exists so benchmarks exercise the real generate/parse path.
+"""
+
+import glob
+import os
+import random
+import tempfile
+
+from specialty_rules import RULE_CLASSIFIER, SPECIALTY_RULES
+
+SPECIAL_TOKENS = ["<pad>", "<unk>", "<bos>", "<eos>"]
+
+
+def _training_texts():
+    texts = []
+    for path in sorted(glob.glob("test_files/*.txt")):
+        with open(path, encoding="utf-8") as f:
+            texts.extend(line.strip() for line in f if len(line.strip()) > 20)
+    for _, _, _, keywords in SPECIALTY_RULES:
+        texts.extend(f"I have {keyword} problems" for keyword in keywords)
+    return texts
+
+
+def _vocabulary(prompt_words):
+    words = set(prompt_words)
+    words.update("SPECIALTY: URGENCY: SUMMARY: Low Medium High General Medicine".split())
+    for specialty, urgency, summary, keywords in SPECIALTY_RULES:
+        words.update(specialty.split())
+        words.update(summary.split())
+        for keyword in keywords:
+            words.update(keyword.split())
+    for text in _training_texts():
+        words.update(text.split())
+    return sorted(words)
+
+
+def _answer(text):
+    result = RULE_CLASSIFIER.classify(text)
+    return f"\nSPECIALTY: {result['specialty']}\nURGENCY: {result['urgency']}\nSUMMARY: {result['summary']}\n"
+
+
+def build_tiny_model(path=None, hidden_size=64, num_layers=2, train_steps=300, seed=0):
+    """Create, train and save a tiny model + tokenizer, returning the directory path"""
+    import torch
+    from tokenizers import Regex, Tokenizer, models, pre_tokenizers, decoders
+    from transformers import LlamaConfig, LlamaForCausalLM, PreTrainedTokenizerFast
+    from medical_analyzer import MedicalAnalyzer
+
+    path = path or os.path.join(tempfile.gettempdir(), "tiny-medical-analyzer-v2")
+    if os.path.exists(os.path.join(path, "config.json")):
+        return path
+
+    build_prompt = MedicalAnalyzer(load_model=False)._build_prompt
+    texts = _training_texts()
+    prompt_words = build_prompt("").split()
+    vocab = {token: i for i, token in enumerate(SPECIAL_TOKENS + ["\n"] + _vocabulary(prompt_words))}
+    backend = Tokenizer(models.WordLevel(vocab=vocab, unk_token="<unk>"))
+    # Words and newlines are tokens; other whitespace is dropped
+    backend.pre_tokenizer = pre_tokenizers.Split(Regex(r"\n|\S+"), behavior="removed", invert=True)
+    backend.decoder = decoders.WordPiece(prefix="##")  # joins words with spaces
+    tokenizer = PreTrainedTokenizerFast(
+        tokenizer_object=backend,
+        pad_token="<pad>", unk_token="<unk>", bos_token="<bos>", eos_token="<eos>",
+    )
+
+    torch.manual_seed(seed)
+    config = LlamaConfig(
+        vocab_size=len(vocab),
+        hidden_size=hidden_size,
+        intermediate_size=hidden_size * 2,
+        num_hidden_layers=num_layers,
+        num_attention_heads=2,
+        num_key_value_heads=1,
+        max_position_embeddings=2048,
+        pad_token_id=vocab["<pad>"],
+        bos_token_id=vocab["<bos>"],
+        eos_token_id=vocab["<eos>"],
+    )
+    model = LlamaForCausalLM(config)
+
+    # Teach it the answer format: loss only on the answer tokens
+    rng = random.Random(seed)
+    optimizer = torch.optim.AdamW(model.parameters(), lr=3e-3)
+    model.train()
+    for _ in range(train_steps):
+        batch = rng.sample(texts, min(8, len(texts)))
+        examples = []
+        for text in batch:
+            prompt_ids = tokenizer(build_prompt(text))["input_ids"]
+            answer_ids = tokenizer(_answer(text))["input_ids"] + [tokenizer.eos_token_id]
+            examples.append((prompt_ids + answer_ids, [-100] * len(prompt_ids) + answer_ids))
+        width = max(len(ids) for ids, _ in examples)
+        input_ids = torch.tensor([[tokenizer.pad_token_id] * (width - len(ids)) + ids for ids, _ in examples])
+        labels = torch.tensor([[-100] * (width - len(lbl)) + lbl for _, lbl in examples])
+        attention_mask = (torch.arange(width)[None, :] >= torch.tensor([[width - len(ids)] for ids, _ in examples]))
+        loss = model(input_ids=input_ids, attention_mask=attention_mask.long(), labels=labels).loss
+        loss.backward()
+        optimizer.step()
+        optimizer.zero_grad()
+    model.eval()
+
+    tokenizer.save_pretrained(path)
+    model.save_pretrained(path)
+    return path
+
+
+if __name__ == "__main__":
+    print(build_tiny_model())
@@ -0,0 +1,135 @@
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class ContentCache:
+    """Content-addressed cache of JSON-serializable dicts.
+
+    Entries live in an in-memory LRU bounded by max_entries and, with
+    max_bytes, by what entry_bytes() says they take. With a ttl they expire
+    that many seconds after being computed. With a path, entries are also
+    written to a SQLite table so they survive restarts; the disk tier is
+    bounded by max_disk_entries. Subclasses pick the table and the key.
+    """
+
+    table = None
+
+    def __init__(self, max_entries=256, ttl=None, max_bytes=None, path=None, max_disk_entries=10000):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.max_disk_entries = max_disk_entries
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                f"CREATE TABLE IF NOT EXISTS {self.table} "
+                "(key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    def entry_bytes(self, value):
+        """Memory counted against max_bytes for one cached value"""
+        return 0
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                created, value = entry
+                if not self._expired(created, now):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return dict(value)
+                self._discard(key)
+                self.evictions += 1
+
+            if self._db is not None:
+                row = self._db.execute(f"SELECT value, created FROM {self.table} WHERE key = ?", (key,)).fetchone()
+                if row is not None and not self._expired(row[1], now):
+                    self._db.execute(f"UPDATE {self.table} SET accessed = ? WHERE key = ?", (now, key))
+                    self._db.commit()
+                    value = json.loads(row[0])
+                    self._store(key, row[1], value)
+                    self.hits += 1
+                    return dict(value)
+                if row is not None:
+                    self._db.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+                    self._db.commit()
+                    self.evictions += 1
+
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        now = time.time()
+        value = dict(value)
+        with self._lock:
+            self._store(key, now, value)
+            if self._db is not None:
+                self._db.execute(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                    (key, json.dumps(value), now, now),
+                )
+                overflow = self._db.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0] \
+                    - self.max_disk_entries
+                if overflow > 0:
+                    self._db.execute(
+                        f"DELETE FROM {self.table} WHERE key IN "
+                        f"(SELECT key FROM {self.table} ORDER BY accessed LIMIT ?)",
+                        (overflow,),
+                    )
+                    self.evictions += overflow
+                self._db.commit()
+
+    def _expired(self, created, now):
+        return self.ttl is not None and now - created > self.ttl
+
+    def _discard(self, key):
+        _, value = self._entries.pop(key)
+        self._bytes -= self.entry_bytes(value)
+
+    def _store(self, key, created, value):
+        if key in self._entries:
+            self._discard(key)
+        self._entries[key] = (created, value)
+        self._bytes += self.entry_bytes(value)
+        # The newest entry stays even if it alone is over max_bytes
+        while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and len(self._entries) > 1 and self._bytes > self.max_bytes):
+            self._discard(next(iter(self._entries)))
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._db is not None:
+                self._db.execute(f"DELETE FROM {self.table}")
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def close(self):
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -0,0 +1,377 @@
+import argparse
+import csv
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import time
+from array import array
+from contextlib import contextmanager
+
+import numpy as np
+
+from doctor_index import DoctorColumns, DoctorIndex, DoctorRecord, ORDERINGS
+
+# Numeric columns written to memory-mapped .npy files in a snapshot
+NUMERIC_COLUMNS = {"rating": np.float32, "price": np.int32, "experience": np.int32}
+
+
+def _doctor(name, specialty, rating, price, experience):
+    return {
+        "name": name,
+        "specialty": specialty,
+        "rating": float(rating),
+        "price": int(float(price)),
+        "experience": int(float(experience)),
+    }
+
+
+def read_csv(path):
+    """Stream doctors from a CSV file with name/specialty/rating/price/experience columns"""
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            yield _doctor(row["name"], row["specialty"], row["rating"], row["price"], row["experience"])
+
+
+def read_parquet(path, batch_size=65536):
+    """Stream doctors from a Parquet file one record batch at a time"""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("Reading Parquet directories requires pyarrow: pip install pyarrow")
+    columns = ["name", "specialty", "rating", "price", "experience"]
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=columns):
+        data = batch.to_pydict()
+        for row in zip(*(data[c] for c in columns)):
+            yield _doctor(*row)
+
+
+def read_sqlite(path, table="doctors"):
+    """Stream doctors from a SQLite table without fetching it all at once"""
+    db = sqlite3.connect(path)
+    try:
+        rows = db.execute(f'SELECT name, specialty, rating, price, experience FROM "{table}"')
+        for row in rows:
+            yield _doctor(*row)
+    finally:
+        db.close()
+
+
+def read_doctors(path):
+    """Pick a reader from the file extension"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return read_csv(path)
+    if extension in (".parquet", ".pq"):
+        return read_parquet(path)
+    if extension in (".db", ".sqlite", ".sqlite3"):
+        return read_sqlite(path)
+    raise ValueError(f"Unsupported doctor directory format: {path}")
+
+
+@contextmanager
+def _snapshot_lock(root):
+    """Exclusive lock on root, held by whoever builds or prunes its snapshots"""
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, ".lock"), "w") as f:
+        _lock_file(f, True)
+        try:
+            yield
+        finally:
+            _lock_file(f, False)
+
+
+def _lock_file(f, lock):
+    """Take (or release) an exclusive lock on an open file: flock on POSIX, msvcrt on Windows"""
+    try:
+        import fcntl
+    except ImportError:
+        import msvcrt
+        f.seek(0)
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK if lock else msvcrt.LK_UNLCK, 1)
+                return
+            except OSError:
+                # LK_LOCK gives up after ten one-second retries; keep waiting
+                if not lock:
+                    raise
+    fcntl.flock(f, fcntl.LOCK_EX if lock else fcntl.LOCK_UN)
+
+
+def _source_stamp(source):
+    """Path, size and mtime of a source file; None for in-memory doctors"""
+    if not isinstance(source, str):
+        return None
+    stat = os.stat(source)
+    return {"path": os.path.abspath(source), "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+def current_snapshot(root):
+    """Directory CURRENT points to, or None before the first build"""
+    try:
+        with open(os.path.join(root, "CURRENT")) as f:
+            return os.path.join(root, f.read().strip())
+    except FileNotFoundError:
+        return None
+
+
+def build_snapshot(doctors, root, keep=2, source=None):
+    """Write doctors as a memory-mappable snapshot under root and make it current.
+
+    Each snapshot lives in its own subdirectory: numeric columns and the
+    presorted id orderings as .npy files, names as one UTF-8 blob. It is
+    written to a temporary directory and renamed into place, then the
+    CURRENT pointer is swapped with os.replace, so readers see either the
+    old or the new snapshot, never a mix. Returns the snapshot directory.
+    """
+    with _snapshot_lock(root):
+        return _build_snapshot(doctors, root, keep, _source_stamp(source))
+
+
+def ensure_snapshot(source, root, rebuild=False, keep=2):
+    """Build a snapshot of source under root unless CURRENT is already up to date.
+
+    Safe to call from many processes at once: one builds while the rest
+    wait on the lock and then find CURRENT fresh. A file source is stale
+    once its size or mtime changes; in-memory doctors only get built when
+    there is no snapshot yet (or with rebuild). Returns the snapshot directory.
+    """
+    with _snapshot_lock(root):
+        stamp = _source_stamp(source)
+        path = current_snapshot(root)
+        if path is not None and not rebuild:
+            with open(os.path.join(path, "meta.json")) as f:
+                built_from = json.load(f).get("source")
+            if stamp is None or stamp == built_from:
+                return path
+        doctors = read_doctors(source) if isinstance(source, str) else source
+        return _build_snapshot(doctors, root, keep, stamp)
+
+
+def _build_snapshot(doctors, root, keep, stamp):
+    # Caller holds the snapshot lock
+    specialties = {}
+    specialty_codes = array("i")
+    columns = {column: array("d") for column in NUMERIC_COLUMNS}
+    name_offsets = array("q", [0])
+    names = bytearray()
+    for doctor in doctors:
+        key = doctor["specialty"].lower()
+        if key not in specialties:
+            specialties[key] = (len(specialties), doctor["specialty"])
+        specialty_codes.append(specialties[key][0])
+        for column in NUMERIC_COLUMNS:
+            columns[column].append(doctor[column])
+        names += doctor["name"].encode("utf-8")
+        name_offsets.append(len(names))
+
+    name = f"snapshot-{time.time_ns()}"
+    path = os.path.join(root, f".building-{name}")
+    os.makedirs(path)
+
+    codes = np.asarray(specialty_codes, dtype=np.int32)
+    np.save(os.path.join(path, "specialty.npy"), codes)
+    values = {c: np.asarray(columns[c], dtype=dtype) for c, dtype in NUMERIC_COLUMNS.items()}
+    for column, data in values.items():
+        np.save(os.path.join(path, f"{column}.npy"), data)
+    np.save(os.path.join(path, "name_offsets.npy"), np.asarray(name_offsets, dtype=np.int64))
+    with open(os.path.join(path, "names.bin"), "wb") as f:
+        f.write(names)
+
+    # Same tie-breaking as DoctorIndex: see doctor_index.ORDERINGS
+    ids = np.arange(len(codes))
+    rating, price, experience = values["rating"], values["price"], values["experience"]
+    sort_keys = {
+        "medium": (ids, price, -rating),
+        "low": (ids, -rating, price),
+        "high": (ids, price, -experience, -rating),
+    }
+    for ordering, keys in sort_keys.items():
+        overall = np.lexsort(keys)
+        by_specialty = np.lexsort(keys + (codes,))
+        np.save(os.path.join(path, f"overall_{ordering}.npy"), overall.astype(np.int64))
+        np.save(os.path.join(path, f"order_{ordering}.npy"), by_specialty.astype(np.int64))
+        if ordering == "medium":
+            # Columns regrouped by specialty, so a specialty's values are one
+            # contiguous slice for vectorized scoring
+            for column, data in values.items():
+                np.save(os.path.join(path, f"bucket_{column}.npy"), data[by_specialty])
+    bounds = np.searchsorted(np.sort(codes), np.arange(len(specialties) + 1))
+
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump({
+            "count": len(codes),
+            "specialties": [name for _, name in sorted(specialties.values())],
+            "bounds": bounds.tolist(),
+            "source": stamp,
+        }, f)
+
+    published = os.path.join(root, name)
+    os.rename(path, published)
+    pointer = os.path.join(root, "CURRENT")
+    with open(pointer + ".tmp", "w") as f:
+        f.write(name)
+    os.replace(pointer + ".tmp", pointer)
+
+    # Only published snapshots older than CURRENT go; processes that still
+    # map them keep their pages. Under the lock, .building-* directories are
+    # leftovers of builds that crashed.
+    for entry in os.listdir(root):
+        if entry.startswith(".building-"):
+            shutil.rmtree(os.path.join(root, entry), ignore_errors=True)
+    snapshots = sorted(d for d in os.listdir(root) if d.startswith("snapshot-") and d < name)
+    for old in snapshots[:max(0, len(snapshots) - keep + 1)]:
+        shutil.rmtree(os.path.join(root, old), ignore_errors=True)
+    return published
+
+
+class MappedDoctorIndex:
+    """Read-only DoctorIndex counterpart backed by a memory-mapped snapshot.
+
+    Columns and orderings are opened with mmap, so worker processes serving
+    the same snapshot share one copy of the pages. Records are materialized
+    only for the k doctors a query returns.
+    """
+
+    def __init__(self, root):
+        self.path = current_snapshot(root)
+        if self.path is None:
+            raise FileNotFoundError(f"No doctor snapshot in {root}; build one with ensure_snapshot()")
+        with open(os.path.join(self.path, "meta.json")) as f:
+            meta = json.load(f)
+        self._count = meta["count"]
+        self._specialties = meta["specialties"]
+        self._codes = {name.lower(): code for code, name in enumerate(self._specialties)}
+        self._bounds = meta["bounds"]
+
+        def load(name):
+            return np.load(os.path.join(self.path, f"{name}.npy"), mmap_mode="r")
+
+        self._columns = {column: load(column) for column in NUMERIC_COLUMNS}
+        self._name_offsets = load("name_offsets")
+        self._order = {ordering: load(f"order_{ordering}") for ordering in ORDERINGS}
+        self._overall = {ordering: load(f"overall_{ordering}") for ordering in ORDERINGS}
+        self._specialty_of = load("specialty")
+        self._bucket_columns = {}
+        for column in NUMERIC_COLUMNS:
+            if os.path.exists(os.path.join(self.path, f"bucket_{column}.npy")):
+                self._bucket_columns[column] = load(f"bucket_{column}")
+            else:
+                # Snapshot from before bucket columns: regroup in memory
+                self._bucket_columns[column] = np.asarray(self._columns[column])[self._order["medium"]]
+        self._all_ids = None
+        self.max_price = int(self._columns["price"].max()) if self._count else 0
+        self.max_experience = int(self._columns["experience"].max()) if self._count else 0
+        # np.memmap refuses empty files
+        self._names = np.memmap(os.path.join(self.path, "names.bin"), dtype=np.uint8, mode="r") \
+            if self._name_offsets[-1] else np.zeros(0, np.uint8)
+
+    def __len__(self):
+        return self._count
+
+    def top(self, specialty, price_preference="medium", k=3):
+        code = self._codes.get(specialty.lower())
+        if code is None:
+            return []
+        start, end = self._bounds[code], self._bounds[code + 1]
+        ids = self._order[self._ordering(price_preference)][start:min(end, start + k)]
+        return [self.record(int(i)) for i in ids]
+
+    def top_overall(self, price_preference="medium", k=3):
+        return [self.record(int(i)) for i in self._overall[self._ordering(price_preference)][:k]]
+
+    def columns(self, specialty=None):
+        """DoctorColumns as zero-copy slices of the mapped arrays"""
+        if specialty is None:
+            if self._all_ids is None:
+                self._all_ids = np.arange(self._count, dtype=np.int64)
+            return DoctorColumns(self._all_ids, *(self._columns[c] for c in ("rating", "price", "experience")))
+        code = self._codes.get(specialty.lower())
+        if code is None:
+            return None
+        start, end = self._bounds[code], self._bounds[code + 1]
+        return DoctorColumns(self._order["medium"][start:end],
+                             *(self._bucket_columns[c][start:end] for c in ("rating", "price", "experience")))
+
+    def ordered_ids(self, specialty=None, price_preference="medium"):
+        """Zero-copy slice of the presorted ids of a specialty (None: every doctor), or None"""
+        ordering = self._ordering(price_preference)
+        if specialty is None:
+            return self._overall[ordering]
+        code = self._codes.get(specialty.lower())
+        if code is None:
+            return None
+        return self._order[ordering][self._bounds[code]:self._bounds[code + 1]]
+
+    def specialties(self):
+        return list(self._codes)
+
+    def add(self, doctor):
+        raise TypeError("Memory-mapped snapshots are read-only; rebuild and reload instead")
+
+    def update(self, name, **fields):
+        raise TypeError("Memory-mapped snapshots are read-only; rebuild and reload instead")
+
+    def _ordering(self, price_preference):
+        return price_preference if price_preference in ORDERINGS else "medium"
+
+    def record(self, i):
+        start, end = self._name_offsets[i], self._name_offsets[i + 1]
+        return DoctorRecord(
+            i,
+            bytes(self._names[start:end]).decode("utf-8"),
+            self._specialties[self._specialty_of[i]],
+            round(float(self._columns["rating"][i]), 2),
+            int(self._columns["price"][i]),
+            int(self._columns["experience"][i]),
+        )
+
+
+class DoctorDirectory:
+    """Holds the live doctor index and swaps in new snapshots atomically.
+
+    Queries grab the current index once and keep using it, so a reload
+    never blocks or disturbs a query already in flight.
+    """
+
+    def __init__(self, index):
+        self._index = index
+        self._reload_lock = threading.Lock()
+
+    @property
+    def index(self):
+        return self._index
+
+    @classmethod
+    def from_source(cls, source, snapshot_root=None):
+        """Index of source; with snapshot_root, maps the current snapshot (built only if missing or stale)"""
+        return cls(cls._build(source, snapshot_root, rebuild=False))
+
+    def reload(self, source, snapshot_root=None):
+        """Build a new index from source off to the side, then swap it in"""
+        with self._reload_lock:
+            index = self._build(source, snapshot_root, rebuild=True)
+            self._index = index
+        return len(index)
+
+    @staticmethod
+    def _build(source, snapshot_root, rebuild):
+        if snapshot_root:
+            ensure_snapshot(source, snapshot_root, rebuild=rebuild)
+            return MappedDoctorIndex(snapshot_root)
+        return DoctorIndex(read_doctors(source) if isinstance(source, str) else source)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the memory-mapped doctor snapshot workers map")
+    parser.add_argument("source", help="CSV, Parquet or SQLite doctor directory")
+    parser.add_argument("snapshot_dir")
+    parser.add_argument("--force", action="store_true", help="rebuild even if the snapshot is up to date")
+    args = parser.parse_args(argv)
+    print(ensure_snapshot(args.source, args.snapshot_dir, rebuild=args.force))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+from bisect import bisect_left, insort
+
+import numpy as np
+
+
+class DoctorRecord:
+    """Compact doctor entry; __slots__ keeps per-record overhead small"""
+    __slots__ = ("id", "name", "specialty", "rating", "price", "experience")
+
+    def __init__(self, id, name, specialty, rating, price, experience):
+        self.id = id
+        self.name = name
+        self.specialty = specialty
+        self.rating = rating
+        self.price = price
+        self.experience = experience
+
+    def as_dict(self):
+        return {
+            "name": self.name,
+            "specialty": self.specialty,
+            "rating": self.rating,
+            "price": self.price,
+            "experience": self.experience,
+        }
+
+
+class DoctorColumns:
+    """Numeric columns of a group of doctors as arrays, aligned with their record ids"""
+    __slots__ = ("ids", "rating", "price", "experience")
+
+    def __init__(self, ids, rating, price, experience):
+        self.ids = ids
+        self.rating = rating
+        self.price = price
+        self.experience = experience
+
+    @classmethod
+    def from_records(cls, records):
+        return cls(
+            np.fromiter((r.id for r in records), np.int64, len(records)),
+            np.fromiter((r.rating for r in records), np.float32, len(records)),
+            np.fromiter((r.price for r in records), np.int32, len(records)),
+            np.fromiter((r.experience for r in records), np.int32, len(records)),
+        )
+
+    def __len__(self):
+        return len(self.ids)
+
+
+# Orderings used by DoctorMatcher, keyed on price preference. The trailing id
+# keeps ties in insertion order and makes every key unique for bisect.
+ORDERINGS = {
+    "medium": lambda d: (-d.rating, d.price, d.id),
+    "low": lambda d: (d.price, -d.rating, d.id),
+    "high": lambda d: (-d.rating, -d.experience, d.price, d.id),
+}
+
+
+class DoctorIndex:
+    """In-memory doctor directory with per-specialty buckets kept presorted.
+
+    Every bucket holds one sorted list of record ids per ordering, so a top-k
+    query is a slice instead of a filter and sort over the whole directory.
+    """
+
+    def __init__(self, doctors=()):
+        self.records = []
+        self._by_name = {}
+        # specialty (lowercase) -> ordering -> sorted record ids
+        self._buckets = {}
+        # same orderings over all doctors, for the no-specialty fallback
+        self._overall = {ordering: [] for ordering in ORDERINGS}
+        # specialty (lowercase, None for all doctors) -> DoctorColumns, built
+        # on first use and dropped whenever the group changes
+        self._columns = {}
+        # (specialty, ordering) -> sorted ids as an array, cached the same way
+        self._ordered = {}
+        # Upper bounds used to put prices and experience on a 0-1 scale
+        self.max_price = 0
+        self.max_experience = 0
+        self.bulk_load(doctors)
+
+    def __len__(self):
+        return len(self.records)
+
+    def bulk_load(self, doctors):
+        """Add many doctors, sorting each bucket once at the end"""
+        for doctor in doctors:
+            record = self._new_record(doctor)
+            bucket = self._bucket(record.specialty)
+            for ordering in ORDERINGS:
+                bucket[ordering].append(record.id)
+                self._overall[ordering].append(record.id)
+
+        for ids_by_ordering in list(self._buckets.values()) + [self._overall]:
+            for ordering, ids in ids_by_ordering.items():
+                key = ORDERINGS[ordering]
+                ids.sort(key=lambda i: key(self.records[i]))
+        self._columns.clear()
+        self._ordered.clear()
+
+    def add(self, doctor):
+        """Insert a single doctor, keeping every ordering sorted"""
+        record = self._new_record(doctor)
+        self._insert(record)
+        return record.id
+
+    def update(self, name, **fields):
+        """Change fields of an existing doctor and re-slot it in its buckets"""
+        for field in fields:
+            if field not in ("specialty", "rating", "price", "experience"):
+                raise ValueError(f"Unknown doctor field: {field}")
+        record = self.records[self._by_name[name]]
+        self._remove(record)
+        for field, value in fields.items():
+            setattr(record, field, value)
+        self._insert(record)
+
+    def record(self, record_id):
+        return self.records[record_id]
+
+    def get(self, name):
+        record_id = self._by_name.get(name)
+        return None if record_id is None else self.records[record_id]
+
+    def top(self, specialty, price_preference="medium", k=3):
+        """Best k doctors of a specialty for the given price preference"""
+        bucket = self._buckets.get(specialty.lower())
+        if not bucket:
+            return []
+        ids = bucket[self._ordering(price_preference)]
+        return [self.records[i] for i in ids[:k]]
+
+    def top_overall(self, price_preference="medium", k=3):
+        ids = self._overall[self._ordering(price_preference)]
+        return [self.records[i] for i in ids[:k]]
+
+    def columns(self, specialty=None):
+        """DoctorColumns for one specialty (None: every doctor), or None if it has no bucket"""
+        key = None if specialty is None else specialty.lower()
+        columns = self._columns.get(key)
+        if columns is None:
+            if key is None:
+                records = self.records
+            elif key in self._buckets:
+                records = [self.records[i] for i in self._buckets[key]["medium"]]
+            else:
+                return None
+            columns = self._columns[key] = DoctorColumns.from_records(records)
+        return columns
+
+    def ordered_ids(self, specialty=None, price_preference="medium"):
+        """All ids of a specialty (None: every doctor) in price_preference order, or None"""
+        key = None if specialty is None else specialty.lower()
+        ordering = self._ordering(price_preference)
+        ids = self._ordered.get((key, ordering))
+        if ids is None:
+            if key is None:
+                source = self._overall[ordering]
+            elif key in self._buckets:
+                source = self._buckets[key][ordering]
+            else:
+                return None
+            ids = self._ordered[key, ordering] = np.asarray(source, dtype=np.int64)
+        return ids
+
+    def specialties(self):
+        return list(self._buckets)
+
+    def _ordering(self, price_preference):
+        return price_preference if price_preference in ORDERINGS else "medium"
+
+    def _new_record(self, doctor):
+        if doctor["name"] in self._by_name:
+            raise ValueError(f"Duplicate doctor: {doctor['name']}")
+        record = DoctorRecord(
+            len(self.records), doctor["name"], doctor["specialty"],
+            doctor["rating"], doctor["price"], doctor["experience"],
+        )
+        self.records.append(record)
+        self._by_name[record.name] = record.id
+        self._widen_scales(record)
+        return record
+
+    def _widen_scales(self, record):
+        # Only ever grows, so it stays an upper bound after updates lower a value
+        self.max_price = max(self.max_price, record.price)
+        self.max_experience = max(self.max_experience, record.experience)
+
+    def _bucket(self, specialty):
+        return self._buckets.setdefault(specialty.lower(), {ordering: [] for ordering in ORDERINGS})
+
+    def _insert(self, record):
+        bucket = self._bucket(record.specialty)
+        self._widen_scales(record)
+        self._forget_columns(record)
+        for ordering, key in ORDERINGS.items():
+            record_key = lambda i: key(self.records[i])
+            insort(bucket[ordering], record.id, key=record_key)
+            insort(self._overall[ordering], record.id, key=record_key)
+
+    def _remove(self, record):
+        bucket = self._buckets[record.specialty.lower()]
+        self._forget_columns(record)
+        for ordering, key in ORDERINGS.items():
+            record_key = lambda i: key(self.records[i])
+            for ids in (bucket[ordering], self._overall[ordering]):
+                ids.pop(bisect_left(ids, key(record), key=record_key))
+
+    def _forget_columns(self, record):
+        for key in (record.specialty.lower(), None):
+            self._columns.pop(key, None)
+            for ordering in ORDERINGS:
+                self._ordered.pop((key, ordering), None)
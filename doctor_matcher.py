@@ -1,34 +1,128 @@
+import heapq
+import logging
+from itertools import islice
+
 from doctors_db import DOCTORS
+from doctor_index import DoctorIndex, ORDERINGS
+from doctor_directory import DoctorDirectory
+from doctor_ranking import count_in_range, first_in_range, rank_by_rating, ranking_weights
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_DIRECTORY = None
+
+# Where to look, in order, when a specialty has no doctors (keys lowercase)
+RELATED_SPECIALTIES = {
+    "rheumatology": ("Orthopedics", "General Medicine"),
+    "orthopedics": ("Rheumatology",),
+    "neurology": ("Psychiatry", "General Medicine"),
+    "psychiatry": ("Neurology",),
+    "ophthalmology": ("Neurology",),
+    "cardiology": ("Pulmonology", "General Medicine"),
+    "pulmonology": ("Cardiology", "General Medicine"),
+    "endocrinology": ("General Medicine",),
+    "gastroenterology": ("General Medicine",),
+    "dermatology": ("General Medicine",),
+    "urology": ("General Medicine",),
+    "gynecology": ("General Medicine",),
+}
+
+def default_directory():
+    """Directory over doctors_db.DOCTORS, built once per process"""
+    global _DEFAULT_DIRECTORY
+    if _DEFAULT_DIRECTORY is None:
+        _DEFAULT_DIRECTORY = DoctorDirectory(DoctorIndex(DOCTORS))
+    return _DEFAULT_DIRECTORY
 
 class DoctorMatcher:
+    def __init__(self, directory=None):
+        self.directory = directory or default_directory()
+    
     def find_doctors(self, specialty, price_preference="medium"):
-        print(f"\n[Doctor Matcher] Looking for specialty: '{specialty}'")
-        print(f"[Doctor Matcher] Price preference: {price_preference}")
-        
-        matches = [d for d in DOCTORS if d["specialty"].lower() == specialty.lower()]
-        
-        print(f"[Doctor Matcher] Found {len(matches)} doctors for {specialty}")
-        
-        if not matches:
-            print(f"[Doctor Matcher] No exact match for '{specialty}', using fallback")
-            return self._find_closest_specialty(specialty)
-        
-        # Sort by rating first (default medium preference)
-        matches.sort(key=lambda x: (-x["rating"], x["price"]))
-        
-        if price_preference == "low":
-            matches.sort(key=lambda x: (x["price"], -x["rating"]))
-        elif price_preference == "high":
-            matches.sort(key=lambda x: (-x["rating"], -x["experience"]))
-        
-        result = matches[:3]
-        print(f"[Doctor Matcher] Returning {len(result)} doctors")
-        for doc in result:
-            print(f"  - {doc['name']} ({doc['specialty']}) - Rating: {doc['rating']}, Price: ${doc['price']}")
-        
-        return result
+        with METRICS.timer("matching"):
+            # Take the live index once: a concurrent reload swaps in a new one
+            # without affecting this query
+            index = self.directory.index
+            
+            # Buckets are presorted per price preference, so this is a slice
+            matches = index.top(specialty, price_preference, k=3)
+            
+            if not matches:
+                logger.debug("No exact match for %r, using fallback", specialty)
+                METRICS.count("matching_fallbacks")
+                return self._find_closest_specialty(specialty, price_preference, index)
+            
+            result = [doc.as_dict() for doc in matches]
+            logger.debug("Matched %d %s doctors (%s price)", len(result), specialty, price_preference)
+            return result
     
-    def _find_closest_specialty(self, specialty):
-        all_doctors = DOCTORS.copy()
-        all_doctors.sort(key=lambda x: (-x["rating"], x["price"]))
-        return all_doctors[:3]
+    def search(self, specialty, price_preference="medium", weights=None, urgency=None, min_price=None,
+               max_price=None, page=1, page_size=3):
+        """Multi-criteria ranking of a specialty's doctors, one page at a time.
+
+        "low", "medium" and "high" page through the same presorted orderings
+        as find_doctors(). "balanced", or any weights (overriding the
+        "balanced" weights, see doctor_ranking.WEIGHT_PRESETS), ranks by
+        weighted score instead; only that ranking takes the analysis
+        urgency into account. When no doctor of the specialty fits the price
+        range, related specialties are ranked together, then every doctor.
+        Returns {"doctors", "total", "page", "page_size", "fallback"} where
+        fallback is None, "related" or "any"; weighted results carry each
+        doctor's score (None for the orderings).
+        """
+        if page < 1 or page_size < 1:
+            raise ValueError("page and page_size must be at least 1")
+        ordering = price_preference if price_preference in ORDERINGS and not weights else None
+        if ordering is None:
+            weights = ranking_weights(price_preference, **(weights or {}))
+        k = page * page_size
+        with METRICS.timer("matching"):
+            index = self.directory.index
+            # Indexed by id, for looking up the doctors of presorted ids
+            everyone = index.columns(None)
+            scales = (index.max_price, index.max_experience)
+            tiers = [(None, [specialty]), ("related", RELATED_SPECIALTIES.get(specialty.lower(), ())), ("any", [None])]
+            for fallback, specialties in tiers:
+                ranked, total = [], 0
+                for name in specialties:
+                    columns = index.columns(name)
+                    if columns is None:
+                        continue
+                    if ordering:
+                        ranked.append(first_in_range(index.ordered_ids(name, ordering), everyone.price, k,
+                                                     min_price, max_price))
+                    else:
+                        cheapest = everyone.price[index.ordered_ids(name, "low")[0]]
+                        ranked.append(rank_by_rating(index.ordered_ids(name, "medium"), everyone, weights, k, urgency,
+                                                     min_price, max_price, scales, cheapest))
+                    total += count_in_range(columns.price, min_price, max_price)
+                if total:
+                    break
+            if fallback:
+                logger.debug("No %r doctors in range, using %s fallback", specialty, fallback)
+                METRICS.count("matching_fallbacks")
+            # Each specialty's list is already best-first: merge, don't re-sort
+            if ordering:
+                if len(ranked) == 1:
+                    # Only the page's records are ever materialized
+                    page_items = [index.record(int(i)) for i in ranked[0][k - page_size:k]]
+                else:
+                    lists = [[index.record(int(i)) for i in ids] for ids in ranked]
+                    page_items = islice(heapq.merge(*lists, key=ORDERINGS[ordering]), k - page_size, k)
+                doctors = [dict(record.as_dict(), score=None) for record in page_items]
+            else:
+                page_items = islice(heapq.merge(*ranked), k - page_size, k)
+                doctors = [dict(index.record(i).as_dict(), score=round(-neg_score, 4))
+                           for neg_score, _, i in page_items]
+        return {"doctors": doctors, "total": total, "page": page, "page_size": page_size, "fallback": fallback}
+
+    def _find_closest_specialty(self, specialty, price_preference, index):
+        matches = []
+        for related in RELATED_SPECIALTIES.get(specialty.lower(), ()):
+            matches += index.top(related, price_preference, k=3 - len(matches))
+            if len(matches) == 3:
+                break
+        if not matches:
+            matches = index.top_overall("medium", k=3)
+        return [doc.as_dict() for doc in matches]
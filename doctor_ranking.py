@@ -0,0 +1,197 @@
+import heapq
+from itertools import islice
+
+import numpy as np
+
+from doctor_index import DoctorColumns
+
+CRITERIA = ("rating", "price", "experience", "urgency")
+
+# Weighted presets for score(): weighted sums of rating (out of 5),
+# cheapness (1 - price / most expensive) and experience (years / most
+# experienced). The "low", "medium" and "high" price preferences are not
+# weighted at all: search() pages through the index's presorted orderings
+# (doctor_index.ORDERINGS) so they rank exactly like find_doctors().
+WEIGHT_PRESETS = {
+    "balanced": {"rating": 1.0, "price": 0.4, "experience": 0.1, "urgency": 0.5},
+}
+
+# Analysis urgency as a 0-1 level
+URGENCY_LEVELS = {"low": 0.0, "medium": 0.5, "high": 1.0}
+
+MAX_RATING = 5.0
+
+# Presorted ids are scanned this many at a time (doubling each round)
+FILTER_CHUNK = 1024
+
+# Above this many candidates the k-th best of every SAMPLE_STEP-th score is
+# used to discard most of them before the partial sort
+SAMPLE_ABOVE = 4096
+SAMPLE_STEP = 64
+
+
+def ranking_weights(preset="balanced", **overrides):
+    """Weights of a WEIGHT_PRESETS entry (default "balanced") with any criteria overridden"""
+    for criterion in overrides:
+        if criterion not in CRITERIA:
+            raise ValueError(f"Unknown ranking criterion {criterion!r}, expected one of {CRITERIA}")
+    weights = dict(WEIGHT_PRESETS.get(preset, WEIGHT_PRESETS["balanced"]))
+    weights.update(overrides)
+    return weights
+
+
+def score(columns, weights, urgency=None, max_price=0, max_experience=0):
+    """Weighted score of every doctor in columns, as one float32 array.
+
+    Urgency moves weight from price towards rating and experience: with the
+    urgency weight at 1, a High-urgency case ignores price altogether and
+    counts quality twice.
+    """
+    shift = _urgency_shift(weights, urgency)
+    quality = 1.0 + shift
+    # dtype keeps the int columns from being promoted to float64
+    scores = np.multiply(columns.rating, weights["rating"] * quality / MAX_RATING, dtype=np.float32)
+    if weights["experience"] and max_experience:
+        scores += np.multiply(columns.experience, weights["experience"] * quality / max_experience,
+                              dtype=np.float32)
+    price_weight = weights["price"] * max(0.0, 1.0 - shift)
+    if price_weight and max_price:
+        scores += np.float32(price_weight)
+        scores -= np.multiply(columns.price, price_weight / max_price, dtype=np.float32)
+    return scores
+
+
+def _urgency_shift(weights, urgency):
+    return weights["urgency"] * URGENCY_LEVELS.get(str(urgency).lower(), 0.0)
+
+
+def rank(columns, weights, k, urgency=None, min_price=None, max_price=None, scales=(0, 0)):
+    """Best k doctors of columns as ([(-score, price, id)] best first, number passing the filters).
+
+    A partial sort (argpartition) picks the k best without ordering the
+    rest; equal scores go to the cheaper doctor, then the lower id, so
+    results and pages are stable.
+    """
+    scores = score(columns, weights, urgency, *scales)
+    ids, prices = columns.ids, columns.price
+    mask = None
+    if min_price is not None:
+        mask = prices >= min_price
+    if max_price is not None:
+        below = prices <= max_price
+        mask = below if mask is None else mask & below
+    if mask is not None:
+        # Compress rather than score the rest -inf: argpartition slows down
+        # badly on long runs of equal values
+        selected = np.flatnonzero(mask)
+        scores, ids, prices = scores[selected], ids[selected], prices[selected]
+
+    total = len(scores)
+    k = min(k, total)
+    if k == 0:
+        return [], total
+    if k < total:
+        if total > SAMPLE_ABOVE and k * SAMPLE_STEP < total:
+            # A sample's k-th best is never better than the true k-th best,
+            # so everything below it can go
+            sample = scores[::SAMPLE_STEP]
+            floor = np.partition(sample, len(sample) - k)[len(sample) - k]
+            keep = np.flatnonzero(scores >= floor)
+            scores, ids, prices = scores[keep], ids[keep], prices[keep]
+        n = len(scores)
+        cut = scores[np.argpartition(scores, n - k)[n - k:]].min()
+        above = np.flatnonzero(scores > cut)
+        tied = np.flatnonzero(scores == cut)
+        need = k - len(above)
+        if need < len(tied):
+            # Coarse presets tie thousands of doctors on the k-th score: take
+            # the cheapest (then lowest id) of them without sorting them all
+            tie_key = prices[tied].astype(np.int64) * (int(ids[tied].max()) + 1) + ids[tied]
+            tied = tied[np.argpartition(tie_key, need - 1)[:need]]
+        candidates = np.concatenate((above, tied))
+        scores, ids, prices = scores[candidates], ids[candidates], prices[candidates]
+    best = np.lexsort((ids, prices, -scores))[:k]
+    return list(zip((-scores[best]).tolist(), prices[best].tolist(), ids[best].tolist())), total
+
+
+def rank_by_rating(by_rating, columns, weights, k, urgency=None, min_price=None, max_price=None, scales=(0, 0),
+                   cheapest=0):
+    """Same best k as rank(), reading only as far down the rating order as it has to.
+
+    by_rating holds ids in the "medium" ordering (best rating first, then
+    cheapest), columns is indexed by id and cheapest is the group's lowest
+    price. Chunks (doubling in size) are ranked one at a time until the
+    k-th best score beats anything the doctors further down could still
+    reach, so unless rating counts against a doctor only the top of the
+    order is ever scored.
+    """
+    best, start = [], 0
+    step = FILTER_CHUNK if weights["rating"] * (1.0 + _urgency_shift(weights, urgency)) > 0 else len(by_rating)
+    cheapest = max(cheapest, min_price or 0)
+    while start < len(by_rating):
+        chunk = np.asarray(by_rating[start:start + step])
+        part = DoctorColumns(chunk, columns.rating[chunk], columns.price[chunk], columns.experience[chunk])
+        best = list(islice(heapq.merge(best, rank(part, weights, k, urgency, min_price, max_price, scales)[0]), k))
+        start += step
+        step *= 2
+        if len(best) == k and start < len(by_rating) \
+                and _ceiling(by_rating, columns, start, weights, urgency, scales, cheapest) < -best[-1][0]:
+            break
+    return best
+
+
+def _ceiling(by_rating, columns, start, weights, urgency, scales, cheapest):
+    """Best score any doctor of by_rating[start:] could reach.
+
+    The rest of the next doctor's rating costs at least what it does;
+    lower ratings cost at least cheapest. Both are scored by score() itself
+    at the extreme experience and price, so float32 rounding cannot tip it.
+    """
+    ratings, prices = columns.rating, columns.price
+    rating = ratings[by_rating[start]]
+    corners = [(rating, prices[by_rating[start]]), (rating, scales[0])]
+    # Binary search for the first lower rating
+    lo, hi = start, len(by_rating)
+    while hi - lo > 1:
+        mid = (lo + hi) // 2
+        if ratings[by_rating[mid]] < rating:
+            hi = mid
+        else:
+            lo = mid
+    if hi < len(by_rating):
+        corners += [(ratings[by_rating[hi]], cheapest), (ratings[by_rating[hi]], scales[0])]
+    corners = [(r, p, e) for r, p in corners for e in (0, scales[1])]
+    extremes = DoctorColumns(None, *(np.array(values, dtype) for values, dtype
+                                     in zip(zip(*corners), (np.float32, np.int32, np.int32))))
+    return score(extremes, weights, urgency, *scales).max()
+
+
+def first_in_range(ordered_ids, prices, k, min_price=None, max_price=None):
+    """First k of the presorted ordered_ids whose price (prices is indexed by id) is in range.
+
+    Scans in growing chunks, so a page near the top costs about k /
+    (fraction in range) lookups rather than a pass over every doctor.
+    """
+    if min_price is None and max_price is None:
+        return ordered_ids[:k]
+    found, missing, start, step = [], k, 0, FILTER_CHUNK
+    while missing > 0 and start < len(ordered_ids):
+        chunk = np.asarray(ordered_ids[start:start + step])
+        found.append(chunk[_in_range(prices[chunk], min_price, max_price)][:missing])
+        missing -= len(found[-1])
+        start += step
+        step *= 2
+    return np.concatenate(found) if found else ordered_ids[:0]
+
+
+def count_in_range(prices, min_price=None, max_price=None):
+    if min_price is None and max_price is None:
+        return len(prices)
+    return int(np.count_nonzero(_in_range(prices, min_price, max_price)))
+
+
+def _in_range(prices, min_price, max_price):
+    mask = np.ones(len(prices), dtype=bool) if min_price is None else prices >= min_price
+    if max_price is not None:
+        mask &= prices <= max_price
+    return mask
@@ -1,24 +1,175 @@
-import PyPDF2
-import docx
+import codecs
+import io
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from metrics import METRICS
+
+logger = logging.getLogger(__name__)
+
+# Text files are decoded in chunks so a character budget can stop reading early
+TXT_CHUNK_BYTES = 64 * 1024
+
+
+_worker_reader = None
+
+
+def _init_pdf_worker(data):
+    """Parse the PDF once per worker process; tasks then only carry page ranges"""
+    import PyPDF2
+
+    global _worker_reader
+    _worker_reader = PyPDF2.PdfReader(io.BytesIO(data))
+
+
+def _extract_pdf_pages(start, stop):
+    return [_worker_reader.pages[i].extract_text() for i in range(start, stop)]
+
+
+def _upload_view(file):
+    """Zero-copy memoryview of an in-memory upload (BytesIO, Streamlit's UploadedFile), else None"""
+    getbuffer = getattr(file, "getbuffer", None)
+    return getbuffer() if getbuffer is not None else None
+
 
 class DocumentProcessor:
-    def extract_text(self, file):
+    def __init__(self, cache=None):
+        # Optional ExtractionCache: identical uploads are only parsed once
+        self.cache = cache
+
+    def extract_text(self, file, max_chars=None):
+        text, _ = self.extract_with_stats(file, max_chars)
+        return text
+
+    def extract_with_stats(self, file, max_chars=None):
+        """Extract text, stopping once max_chars have been collected.
+
+        Returns (text, stats) where stats has the number of pages or
+        paragraphs read, characters, seconds taken, whether reading
+        stopped at the budget and whether the text came from the cache.
+        """
+        start = time.perf_counter()
+        view = _upload_view(file) if self.cache is not None else None
+        if view is None:
+            text, stats, _ = self._extract(file, max_chars, start)
+            return text, stats
+        with view:
+            key = self.cache.make_key(view, file.name, max_chars)
+            cached = self.cache.get(key, view.nbytes)
+            if cached is not None:
+                METRICS.count("extraction_cache_hits")
+                METRICS.count("extraction_bytes_saved", view.nbytes)
+                stats = {
+                    "parts": cached["parts"],
+                    "chars": len(cached["text"]),
+                    "seconds": time.perf_counter() - start,
+                    "budget_reached": cached["budget_reached"],
+                    "cached": True,
+                }
+                return cached["text"], stats
+        text, stats, failed = self._extract(file, max_chars, start)
+        # Failures are not cached: installing a missing parser may fix them
+        if not failed:
+            self.cache.put(key, {"text": text, "parts": stats["parts"], "budget_reached": stats["budget_reached"],
+                                 "seconds": stats["seconds"]})
+        return text, stats
+
+    def _extract(self, file, max_chars, start):
+        # Pages and paragraphs are joined with spaces; text chunks are
+        # pieces of one string
+        separator = "" if file.name.endswith('.txt') else " "
+        parts, chars, budget_reached, failed = [], 0, False, False
         try:
-            if file.name.endswith('.pdf'):
-                return self._extract_pdf(file)
-            elif file.name.endswith('.docx'):
-                return self._extract_docx(file)
-            elif file.name.endswith('.txt'):
-                return file.read().decode('utf-8')
+            for part in self.iter_text(file):
+                parts.append(part)
+                chars += len(part) + len(separator)
+                if max_chars is not None and chars >= max_chars:
+                    budget_reached = True
+                    break
         except Exception as e:
-            print(f"Error extracting text: {e}")
+            logger.warning("Error extracting text from %s: %s", file.name, e)
+            parts, failed = [], True
+        text = separator.join(parts)
+        METRICS.observe("extraction", time.perf_counter() - start)
+        METRICS.count("extracted_chars", len(text))
+        stats = {
+            "parts": len(parts),
+            "chars": len(text),
+            "seconds": time.perf_counter() - start,
+            "budget_reached": budget_reached,
+            "cached": False,
+        }
+        return text, stats, failed
+
+    def iter_text(self, file):
+        """Yield text page by page (PDF), paragraph by paragraph (DOCX) or chunk by chunk (TXT)"""
+        if file.name.endswith('.pdf'):
+            return self._iter_pdf(file)
+        elif file.name.endswith('.docx'):
+            return self._iter_docx(file)
+        elif file.name.endswith('.txt'):
+            return self._iter_txt(file)
+        return iter(())
+
+    def extract_text_parallel(self, file, workers=None):
+        """Extract a whole PDF with its pages fanned out over a process pool"""
+        if not file.name.endswith('.pdf'):
+            return self.extract_text(file)
+        import PyPDF2
+
+        try:
+            data = file.read()
+            reader = PyPDF2.PdfReader(io.BytesIO(data))
+            page_count = len(reader.pages)
+            workers = min(workers or os.cpu_count() or 1, page_count)
+            if workers <= 1:
+                return " ".join(page.extract_text() for page in reader.pages)
+            # A few ranges per worker keeps them busy if some pages are slower
+            step = max(1, -(-page_count // (workers * 4)))
+            ranges = [(i, min(i + step, page_count)) for i in range(0, page_count, step)]
+            with ProcessPoolExecutor(max_workers=workers, initializer=_init_pdf_worker, initargs=(data,)) as pool:
+                futures = [pool.submit(_extract_pdf_pages, start, stop) for start, stop in ranges]
+                return " ".join(page for future in futures for page in future.result())
+        except Exception as e:
+            logger.warning("Error extracting text from %s: %s", file.name, e)
             return ""
-        return ""
-    
-    def _extract_pdf(self, file):
+
+    def _iter_pdf(self, file):
+        # PDF and DOCX libraries load on first use, not at startup
+        import PyPDF2
+
         reader = PyPDF2.PdfReader(file)
-        return " ".join([page.extract_text() for page in reader.pages])
-    
-    def _extract_docx(self, file):
+        for page in reader.pages:
+            yield page.extract_text()
+
+    def _iter_docx(self, file):
+        import docx
+
         doc = docx.Document(file)
-        return " ".join([para.text for para in doc.paragraphs])
+        for para in doc.paragraphs:
+            yield para.text
+
+    def _iter_txt(self, file):
+        # Incremental decoder so multi-byte characters split across chunks survive
+        decoder = codecs.getincrementaldecoder('utf-8')()
+        view = _upload_view(file)
+        if view is not None:
+            # In-memory upload: decode slices of its buffer instead of read() copies
+            with view:
+                for offset in range(file.tell(), view.nbytes, TXT_CHUNK_BYTES):
+                    text = decoder.decode(view[offset:offset + TXT_CHUNK_BYTES])
+                    if text:
+                        yield text
+        else:
+            while True:
+                chunk = file.read(TXT_CHUNK_BYTES)
+                if not chunk:
+                    break
+                text = decoder.decode(chunk)
+                if text:
+                    yield text
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
@@ -0,0 +1,52 @@
+import hashlib
+import sys
+
+from content_cache import ContentCache
+
+# Bump when extraction output changes so stale disk entries are not reused
+EXTRACTOR_VERSION = 1
+
+
+class ExtractionCache(ContentCache):
+    """Extracted document text keyed by a hash of the file's bytes.
+
+    The in-memory LRU is bounded both by entry count and by the memory the
+    cached strings take. With a path, entries are also written to SQLite so
+    re-uploads are served across restarts. Identical bytes always extract
+    to the same text, so entries never expire; the disk tier is bounded by
+    max_disk_entries.
+    """
+
+    table = "extraction_cache"
+
+    def __init__(self, max_entries=128, max_bytes=64 * 1024 * 1024, path=None, max_disk_entries=1000):
+        super().__init__(max_entries, max_bytes=max_bytes, path=path, max_disk_entries=max_disk_entries)
+        # Upload bytes and extraction time that hits did not have to spend again
+        self.bytes_saved = 0
+        self.seconds_saved = 0.0
+
+    @staticmethod
+    def make_key(data, filename, max_chars=None):
+        """Hash of the file bytes (any buffer, hashed without copying) and the extraction settings"""
+        digest = hashlib.sha256(data)
+        extension = filename.rsplit(".", 1)[-1].lower()
+        digest.update(f"\0{extension}\0{max_chars}\0{EXTRACTOR_VERSION}".encode("utf-8"))
+        return digest.hexdigest()
+
+    def entry_bytes(self, value):
+        return sys.getsizeof(value["text"])
+
+    def get(self, key, size=0):
+        """Cached {text, parts, budget_reached, seconds} or None; size is the upload's byte count"""
+        value = super().get(key)
+        if value is not None:
+            with self._lock:
+                self.bytes_saved += size
+                self.seconds_saved += value["seconds"]
+        return value
+
+    def stats(self):
+        stats = super().stats()
+        with self._lock:
+            stats.update(memory_bytes=self._bytes, bytes_saved=self.bytes_saved, seconds_saved=self.seconds_saved)
+        return stats
@@ -0,0 +1,89 @@
+import os
+import re
+
+from specialty_rules import trie_pattern
+
+# Phrases removed from user input before it reaches the prompt
+DEFAULT_PATTERNS = [
+    "ignore previous instructions",
+    "ignore all previous",
+    "disregard",
+    "forget everything",
+    "new instructions",
+    "system:",
+    "assistant:",
+    "<|im_start|>",
+    "<|im_end|>",
+]
+# Prompt delimiters are removed too, but are not reported as injection attempts
+DELIMITERS = ("```", "###")
+
+_DEFAULT_SANITIZER = None
+
+
+def load_patterns(path):
+    """Read one pattern per line; blank lines and lines starting with # are skipped"""
+    with open(path, encoding="utf-8") as f:
+        return [line.strip() for line in f if line.strip() and not line.lstrip().startswith("#")]
+
+
+def default_sanitizer():
+    """DEFAULT_PATTERNS plus any from SANITIZER_PATTERNS_FILE, compiled once per process"""
+    global _DEFAULT_SANITIZER
+    if _DEFAULT_SANITIZER is None:
+        patterns = list(DEFAULT_PATTERNS)
+        if os.getenv("SANITIZER_PATTERNS_FILE"):
+            patterns += load_patterns(os.getenv("SANITIZER_PATTERNS_FILE"))
+        _DEFAULT_SANITIZER = InputSanitizer(patterns)
+    return _DEFAULT_SANITIZER
+
+
+class InputSanitizer:
+    """Case-insensitive removal of injection phrases and delimiters in one regex pass.
+
+    All patterns are compiled into a single trie-shaped regex, which is run
+    over the lowercased text; matched spans are cut from the original text so
+    its casing is kept. Cost grows with the text length, not with the number
+    of patterns.
+    """
+
+    def __init__(self, patterns=DEFAULT_PATTERNS, delimiters=DELIMITERS):
+        self.delimiters = frozenset(delimiters)
+        words = sorted({pattern.lower() for pattern in patterns if pattern} | self.delimiters)
+        self._longest = max(len(word) for word in words)
+        self._regex = re.compile(trie_pattern(words))
+        # For the rare text whose lowercase form changes length (e.g. "İ")
+        self._regex_ignorecase = re.compile(trie_pattern(words), re.IGNORECASE)
+
+    def sanitize(self, text):
+        """Return (cleaned text, injection patterns found in it)"""
+        found = []
+        while True:
+            lowered = text.lower()
+            if len(lowered) == len(text):
+                spans = [match.span() for match in self._regex.finditer(lowered)]
+            else:
+                spans = [match.span() for match in self._regex_ignorecase.finditer(text)]
+            if not spans:
+                return text.strip(), found
+            pieces, joins, end, length = [], [], 0, 0
+            for start, stop in spans:
+                pieces.append(text[end:start])
+                length += start - end
+                joins.append(length)
+                matched = text[start:stop].lower()
+                if matched not in self.delimiters:
+                    found.append(matched)
+                end = stop
+            pieces.append(text[end:])
+            text = "".join(pieces)
+            # Cutting a match out can join two halves into a new one
+            # ("ig###nore previous instructions"). Such a match must straddle
+            # a join, so only the text around the joins is checked before
+            # deciding whether another full pass is needed.
+            if not self._match_across(text, joins):
+                return text.strip(), found
+
+    def _match_across(self, text, joins):
+        reach = self._longest - 1
+        return any(self._regex_ignorecase.search(text, max(0, join - reach), join + reach) for join in joins)
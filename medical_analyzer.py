@@ -1,135 +1,414 @@
-from transformers import AutoTokenizer, AutoModelForCausalLM
-import torch
+import copy
+import logging
 import os
+import threading
+import time
+from collections import deque
 from dotenv import load_dotenv
+from specialty_rules import RULE_CLASSIFIER
+from input_sanitizer import default_sanitizer
+from response_stream import StreamingResponseParser, FieldsCompleteCriteria, parse_line
+from metrics import METRICS
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "google/gemma-2-2b-it"
+# Longer inputs are cut to this many characters before analysis
+MAX_INPUT_CHARS = 5000
+# Bump whenever the prompt or response parsing changes so cached results
+# from the old prompt are not reused
+PROMPT_VERSION = 2
+# Inference backends: "fp16" keeps the original GPU-friendly setup; the
+# others run on CPU, where fp16 matmuls are slow or get upcast anyway
+BACKENDS = ("fp16", "bf16", "fp32", "int8")
+DEFAULT_BACKEND = os.getenv("MODEL_BACKEND", "fp16")
+# torch intra-op threads; None leaves torch's default (all cores)
+DEFAULT_NUM_THREADS = int(os.getenv("TORCH_NUM_THREADS", "0")) or None
+# Upper bound on generated tokens; generation usually stops earlier, as soon
+# as SPECIALTY, URGENCY and SUMMARY have all been written
+MAX_NEW_TOKENS = 200
+# Answer confident cases with the TF-IDF specialty router and only send the
+# rest to the model (or the rule engine)
+ROUTER_ENABLED = os.getenv("SEMANTIC_ROUTER", "").lower() in ("1", "true", "yes")
+# Never load the model: every request uses the rule engine (or the router)
+# and torch/transformers are never imported
+RULES_ONLY = os.getenv("RULES_ONLY", "").lower() in ("1", "true", "yes")
+
+# Fixed instruction header that starts every prompt. Its key/value cache is
+# computed once per loaded model and reused, so only the patient text and
+# the format footer are prefilled per request.
+PROMPT_PREFIX = """Analyze the following medical information and identify:
+1. Primary medical specialty needed (e.g., Cardiology, Dermatology, Neurology, Orthopedics, Gastroenterology, Endocrinology, Pulmonology, Rheumatology, Dentistry, Ophthalmology, Psychiatry, Urology, Gynecology)
+2. Urgency level (Low, Medium, High)
+3. Brief summary of the condition
+
+Patient input:"""
+
+def threads_per_worker(workers):
+    """Torch threads for each of several worker processes; None (torch's default) for one"""
+    # Split the cores between workers so their torch thread pools don't oversubscribe
+    return max(1, (os.cpu_count() or 1) // workers) if workers > 1 else None
+
+
 class MedicalAnalyzer:
-    def __init__(self):
+    def __init__(self, model_name=DEFAULT_MODEL, cache=None, load_model=True, backend=DEFAULT_BACKEND,
+                 num_threads=DEFAULT_NUM_THREADS, router=None):
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+        self.model_name = model_name
+        self.backend = backend
+        self.num_threads = num_threads
+        self.cache = cache
+        # Injection phrases and prompt delimiters are removed in one pass
+        self.sanitizer = default_sanitizer()
+        # Cached answers must be reproducible, so sampling is switched off
+        # (greedy decoding) whenever a cache is attached
+        self.do_sample = cache is None
+        self.model = None
+        self.tokenizer = None
+        self.load_error = None
+        # (header token ids, past key values) for PROMPT_PREFIX
+        self._prefix = None
+        self.reuse_prefix = True
+        # Fast tier in front of the model; None sends everything to the model
+        if router is None and ROUTER_ENABLED:
+            from specialty_router import default_router
+            router = default_router()
+        self.router = router
+        # Per-request generation stats (tokens used, time to first field)
+        self._generation_stats = deque(maxlen=500)
+        # Router outcomes (answered, seconds) and engine time of escalated requests
+        self._routing_stats = deque(maxlen=500)
+        self._escalation_seconds = deque(maxlen=500)
+        self._stats_lock = threading.Lock()
+        # With load_model=False the analyzer answers with the rule engine
+        # until load_model() is called (e.g. from a background thread)
+        if load_model:
+            self.load_model()
+    
+    def load_model(self):
+        """Load tokenizer and weights; returns True once the model is usable"""
+        if RULES_ONLY:
+            self.load_error = "RULES_ONLY is set"
+            return False
         try:
+            # torch and transformers take seconds to import, so they load
+            # here rather than with this module
+            import torch
+            from transformers import AutoTokenizer
+
             # Try to load Gemma 2 2B from Hugging Face
-            model_name = "google/gemma-2-2b-it"
-            print("Loading Gemma 2 2B model...")
-            self.tokenizer = AutoTokenizer.from_pretrained(model_name, token=os.getenv("HF_TOKEN"))
-            self.model = AutoModelForCausalLM.from_pretrained(
-                model_name, 
+            logger.info("Loading %s (%s)...", self.model_name, self.backend)
+            if self.num_threads:
+                torch.set_num_threads(self.num_threads)
+            tokenizer = AutoTokenizer.from_pretrained(self.model_name, token=os.getenv("HF_TOKEN"))
+            # Batched generation needs left padding so every prompt ends
+            # right where its new tokens start
+            tokenizer.padding_side = "left"
+            if tokenizer.pad_token is None:
+                tokenizer.pad_token = tokenizer.eos_token
+            model = self._load_weights()
+            self._prefix = self._build_prefix_cache(tokenizer, model)
+            # Model is assigned last: requests switch over from the rule
+            # engine only once both halves are in place
+            self.tokenizer = tokenizer
+            self.model = model
+            logger.info("%s loaded", self.model_name)
+            return True
+        except Exception as e:
+            logger.warning("Could not load %s, using rule-based fallback: %s", self.model_name, e)
+            self.load_error = str(e)
+            self.model = None
+            return False
+    
+    def _load_weights(self):
+        import torch
+        from transformers import AutoModelForCausalLM
+
+        if self.backend == "fp16":
+            return AutoModelForCausalLM.from_pretrained(
+                self.model_name, 
                 torch_dtype=torch.float16, 
                 device_map="auto",
                 token=os.getenv("HF_TOKEN")
             )
-            print("Gemma 2 2B loaded successfully!")
-        except Exception as e:
-            print(f"Could not load Gemma: {e}")
-            print("Using rule-based fallback...")
-            self.model = None
+        
+        dtype = torch.bfloat16 if self.backend == "bf16" else torch.float32
+        model = AutoModelForCausalLM.from_pretrained(self.model_name, torch_dtype=dtype, token=os.getenv("HF_TOKEN"))
+        if self.backend == "int8":
+            # Dynamic quantization: int8 weights for every Linear layer,
+            # activations quantized on the fly
+            model = torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        return model.eval()
     
-    def analyze_symptoms(self, text):
-        # Basic input validation and sanitization
-        if not text or len(text.strip()) < 5:
+    def _build_prefix_cache(self, tokenizer, model):
+        """Prefill PROMPT_PREFIX once; returns (token ids, past key values)"""
+        import torch
+        from transformers import DynamicCache
+
+        input_ids = tokenizer(PROMPT_PREFIX, return_tensors="pt")["input_ids"].to(model.device)
+        with torch.no_grad():
+            outputs = model(input_ids=input_ids, past_key_values=DynamicCache(config=model.config), use_cache=True)
+        return input_ids[0].tolist(), outputs.past_key_values
+    
+    def _prefix_past(self, input_ids):
+        """Copy of the header's past key values if the prompt starts with the header tokens"""
+        if not self.reuse_prefix or self._prefix is None:
+            return None
+        prefix_ids, past_key_values = self._prefix
+        # Tokenizers may merge across the header/text boundary; only reuse
+        # the cache when the full prompt tokenized to the same header tokens
+        if input_ids.shape[1] <= len(prefix_ids) or input_ids[0, :len(prefix_ids)].tolist() != prefix_ids:
+            return None
+        # generate() appends to the cache, so each request gets its own copy
+        return copy.deepcopy(past_key_values)
+    
+    def analyze_symptoms(self, text, on_update=None):
+        """Analyze text; on_update receives partial results while the model writes them"""
+        text = self._prepare_input(text)
+        if text is None:
             return {"specialty": "General Medicine", "urgency": "Low", "summary": "Insufficient information provided"}
         
-        # Limit input length to prevent abuse
-        if len(text) > 5000:
-            text = text[:5000]
+        # One model for the whole call: the key must name the engine that answers
+        model = self.model
+        key = self._cache_key(text, model)
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                METRICS.count("analyses", engine="cache")
+                return cached
         
-        # Remove potential prompt injection attempts
-        text = self._sanitize_input(text)
+        result = self._route([text])[0] if self.router else None
+        if result is None:
+            start = time.perf_counter()
+            if model:
+                result = self._analyze_with_model(text, model, on_update)
+            else:
+                result = self._analyze_with_rules(text)
+            METRICS.count("analyses", engine="model" if model else "rules")
+            self._record_escalations(1, time.perf_counter() - start)
         
-        if self.model:
-            return self._analyze_with_model(text)
-        else:
-            return self._analyze_with_rules(text)
+        if key:
+            self.cache.put(key, result)
+        return result
     
-    def _sanitize_input(self, text):
-        """Remove potential prompt injection patterns"""
-        # Remove common prompt injection keywords
-        dangerous_patterns = [
-            "ignore previous instructions",
-            "ignore all previous",
-            "disregard",
-            "forget everything",
-            "new instructions",
-            "system:",
-            "assistant:",
-            "<|im_start|>",
-            "<|im_end|>",
-        ]
+    def analyze_symptoms_batch(self, texts, on_updates=None):
+        """Analyze several inputs at once, sharing a single generate call.
+
+        on_updates optionally holds one callback (or None) per text that
+        receives its partial results while the model writes them.
+        """
+        results = [None] * len(texts)
+        pending = []
+        model = self.model
+        for i, text in enumerate(texts):
+            text = self._prepare_input(text)
+            if text is None:
+                results[i] = {"specialty": "General Medicine", "urgency": "Low", "summary": "Insufficient information provided"}
+                continue
+            key = self._cache_key(text, model)
+            cached = self.cache.get(key) if key else None
+            if cached is not None:
+                METRICS.count("analyses", engine="cache")
+                results[i] = cached
+            else:
+                pending.append((i, text, key))
         
-        text_lower = text.lower()
-        for pattern in dangerous_patterns:
-            if pattern in text_lower:
-                # Log potential attack
-                print(f"[Security] Potential prompt injection detected: {pattern}")
-                # Remove the pattern
-                text = text.replace(pattern, "")
-                text = text.replace(pattern.upper(), "")
-                text = text.replace(pattern.title(), "")
+        if pending and self.router:
+            # Confident cases are answered here; only the rest reach the model
+            routed = self._route([text for _, text, _ in pending])
+            for (i, _, key), analysis in zip(pending, routed):
+                if analysis is not None:
+                    results[i] = analysis
+                    if key:
+                        self.cache.put(key, analysis)
+            pending = [entry for entry, analysis in zip(pending, routed) if analysis is None]
         
-        return text.strip()
+        if pending:
+            start = time.perf_counter()
+            indices, prepared, keys = zip(*pending)
+            if model:
+                updates = [on_updates[i] for i in indices] if on_updates else None
+                analyses = self._analyze_with_model_batch(list(prepared), model, updates)
+            else:
+                with METRICS.timer("rule_analysis"):
+                    analyses = RULE_CLASSIFIER.analyze_many(prepared)
+            METRICS.count("analyses", len(analyses), engine="model" if model else "rules")
+            self._record_escalations(len(analyses), (time.perf_counter() - start) / len(analyses))
+            for i, key, analysis in zip(indices, keys, analyses):
+                results[i] = analysis
+                if key:
+                    self.cache.put(key, analysis)
+        
+        return results
     
-    def _analyze_with_model(self, text):
-        # Additional safety: Ensure text doesn't contain prompt delimiters
-        text = text.replace("```", "").replace("###", "")
+    def _prepare_input(self, text):
+        """Validate, truncate and sanitize input; None if there is too little to analyze"""
+        # Basic input validation and sanitization
+        if not text or len(text.strip()) < 5:
+            return None
         
-        prompt = f"""Analyze the following medical information and identify:
-1. Primary medical specialty needed (e.g., Cardiology, Dermatology, Neurology, Orthopedics, Gastroenterology, Endocrinology, Pulmonology, Rheumatology, Dentistry, Ophthalmology, Psychiatry, Urology, Gynecology)
-2. Urgency level (Low, Medium, High)
-3. Brief summary of the condition
-
-Patient input: {text}
+        # Limit input length to prevent abuse
+        if len(text) > MAX_INPUT_CHARS:
+            text = text[:MAX_INPUT_CHARS]
+        
+        # Remove potential prompt injection attempts
+        with METRICS.timer("sanitization"):
+            return self._sanitize_input(text)
+    
+    def _cache_key(self, text, model):
+        if self.cache is None:
+            return None
+        # Quantized weights can answer differently, so the backend is part of the key
+        engine = f"{self.model_name}:{self.backend}" if model else "rules"
+        if self.router:
+            engine += "+router"
+        return self.cache.make_key(text, engine, PROMPT_VERSION)
+    
+    def _generation_kwargs(self):
+        if self.do_sample:
+            return {"max_new_tokens": MAX_NEW_TOKENS, "temperature": 0.7, "do_sample": True}
+        return {"max_new_tokens": MAX_NEW_TOKENS, "do_sample": False}
+    
+    def _sanitize_input(self, text):
+        """Remove potential prompt injection patterns and prompt delimiters"""
+        text, found = self.sanitizer.sanitize(text)
+        if found:
+            # Log potential attack
+            logger.warning("Potential prompt injection detected: %s", ", ".join(sorted(set(found))))
+            for pattern in found:
+                METRICS.count("prompt_injections", pattern=pattern)
+        return text
+    
+    def _build_prompt(self, text):
+        # Text has been through _sanitize_input, which also strips ``` and ###
+        return f"""{PROMPT_PREFIX} {text}
 
 Respond in this exact format:
 SPECIALTY: [specialty name]
 URGENCY: [urgency level]
 SUMMARY: [brief summary]"""
+    
+    def _analyze_with_model(self, text, model, on_update=None):
+        from transformers import StoppingCriteriaList
+
+        prompt = self._build_prompt(text)
         
-        inputs = self.tokenizer(prompt, return_tensors="pt", max_length=1024, truncation=True).to(self.model.device)
-        outputs = self.model.generate(**inputs, max_new_tokens=200, temperature=0.7, do_sample=True)
-        response = self.tokenizer.decode(outputs[0], skip_special_tokens=True)
-        
-        print("\n" + "="*50)
-        print("MODEL OUTPUT:")
-        print("="*50)
-        print(response)
-        print("="*50 + "\n")
+        with METRICS.timer("tokenization"):
+            inputs = self.tokenizer(prompt, return_tensors="pt", max_length=1024, truncation=True).to(model.device)
+        prompt_length = inputs["input_ids"].shape[1]
+        # Parse fields as tokens arrive and stop once all three are written
+        parser = StreamingResponseParser(self.tokenizer, on_update)
+        stopping = StoppingCriteriaList([FieldsCompleteCriteria([parser])])
+        generation_kwargs = self._generation_kwargs()
+        past_key_values = self._prefix_past(inputs["input_ids"])
+        if past_key_values is not None:
+            generation_kwargs["past_key_values"] = past_key_values
+        with METRICS.timer("generation"):
+            outputs = model.generate(**inputs, **generation_kwargs, stopping_criteria=stopping)
+        self._record_generation([parser])
+        with METRICS.timer("parsing"):
+            parser.finish()
+            # Only the new tokens are decoded; the echoed prompt is skipped
+            response = self.tokenizer.decode(outputs[0][prompt_length:], skip_special_tokens=True)
+            logger.debug("Model output:\n%s", response)
+            return self._parse_response(response)
+    
+    def _analyze_with_model_batch(self, texts, model, on_updates=None):
+        from transformers import StoppingCriteriaList
+
+        prompts = [self._build_prompt(text) for text in texts]
         
-        return self._parse_response(response)
+        # Left-padded batch: one generate call for every prompt
+        with METRICS.timer("tokenization"):
+            inputs = self.tokenizer(prompts, return_tensors="pt", padding=True, max_length=1024, truncation=True).to(model.device)
+        prompt_length = inputs["input_ids"].shape[1]
+        parsers = [StreamingResponseParser(self.tokenizer, on_update) for on_update in on_updates or [None] * len(prompts)]
+        stopping = StoppingCriteriaList([FieldsCompleteCriteria(parsers)])
+        with METRICS.timer("generation"):
+            outputs = model.generate(**inputs, **self._generation_kwargs(), stopping_criteria=stopping,
+                                          pad_token_id=self.tokenizer.pad_token_id)
+        self._record_generation(parsers)
+        with METRICS.timer("parsing"):
+            responses = self.tokenizer.batch_decode(outputs[:, prompt_length:], skip_special_tokens=True)
+            logger.debug("Generated %d responses in one call", len(responses))
+            return [self._parse_response(response) for response in responses]
+    
+    def _route(self, texts):
+        """Router answers for confident texts, None where the text must be escalated"""
+        start = time.perf_counter()
+        with METRICS.timer("routing"):
+            routed = self.router.route_many(texts)
+        seconds = (time.perf_counter() - start) / len(texts)
+        results = []
+        with self._stats_lock:
+            for analysis in routed:
+                answered = self.router.is_confident(analysis)
+                self._routing_stats.append((answered, seconds))
+                results.append({field: analysis[field] for field in ("specialty", "urgency", "summary")}
+                               if answered else None)
+        answered = sum(1 for result in results if result is not None)
+        METRICS.count("analyses", answered, engine="router")
+        METRICS.count("router_escalations", len(texts) - answered)
+        return results
+    
+    def _record_escalations(self, count, seconds_each):
+        if not self.router:
+            return
+        with self._stats_lock:
+            self._escalation_seconds.extend([seconds_each] * count)
+    
+    def routing_stats(self):
+        """Share of requests the router answered and the engine time that saved"""
+        with self._stats_lock:
+            stats = list(self._routing_stats)
+            escalated = list(self._escalation_seconds)
+        if not stats:
+            return {"requests": 0}
+        answered = sum(1 for ok, _ in stats if ok)
+        mean_route = sum(s for _, s in stats) / len(stats)
+        mean_escalated = sum(escalated) / len(escalated) if escalated else None
+        return {
+            "requests": len(stats),
+            "escalation_rate": 1 - answered / len(stats),
+            "mean_route_ms": mean_route * 1000,
+            "mean_escalated_ms": mean_escalated * 1000 if mean_escalated is not None else None,
+            # Answered requests skip the escalated engine; every request pays for routing
+            "saved_ms_per_request": (answered / len(stats) * mean_escalated - mean_route) * 1000
+            if mean_escalated is not None else None,
+        }
+    
+    def _record_generation(self, parsers):
+        with self._stats_lock:
+            for parser in parsers:
+                self._generation_stats.append((parser.tokens, parser.complete, parser.first_field_seconds))
+        METRICS.count("generated_tokens", sum(parser.tokens for parser in parsers))
+        METRICS.count("early_stops", sum(1 for parser in parsers if parser.complete))
+    
+    def generation_stats(self):
+        """Tokens generated per request, early stops and time to first complete field"""
+        with self._stats_lock:
+            stats = list(self._generation_stats)
+        if not stats:
+            return {"requests": 0}
+        tokens = [t for t, _, _ in stats]
+        first_field = [s for _, _, s in stats if s is not None]
+        return {
+            "requests": len(stats),
+            "mean_tokens": sum(tokens) / len(tokens),
+            # Upper bound on tokens saved: the cap minus what was generated
+            "mean_tokens_under_cap": MAX_NEW_TOKENS - sum(tokens) / len(tokens),
+            "early_stop_rate": sum(1 for _, early, _ in stats if early) / len(stats),
+            "mean_time_to_first_field_ms": sum(first_field) / len(first_field) * 1000 if first_field else None,
+        }
     
     def _analyze_with_rules(self, text):
-        text_lower = text.lower()
-        
-        print(f"\n[Rule-based Analysis] Input: {text[:100]}...")
-        
-        # Check all specialties with expanded keywords
-        if any(word in text_lower for word in ['tooth', 'teeth', 'dental', 'dentist', 'gum', 'cavity', 'toothache', 'molar', 'filling', 'crown', 'root canal']):
-            result = {"specialty": "Dentistry", "urgency": "Low", "summary": "Dental issue detected"}
-        elif any(word in text_lower for word in ['chest pain', 'heart', 'cardiac', 'cardiology', 'blood pressure', 'palpitation', 'cardiovascular', 'angina']):
-            result = {"specialty": "Cardiology", "urgency": "High", "summary": "Cardiovascular symptoms detected"}
-        elif any(word in text_lower for word in ['rash', 'skin', 'itch', 'acne', 'dermatitis', 'dermatology', 'eczema', 'psoriasis', 'melanoma']):
-            result = {"specialty": "Dermatology", "urgency": "Low", "summary": "Skin condition detected"}
-        elif any(word in text_lower for word in ['back pain', 'joint', 'bone', 'fracture', 'orthopedic', 'orthopedics', 'spine', 'arthritis', 'ligament']):
-            result = {"specialty": "Orthopedics", "urgency": "Medium", "summary": "Musculoskeletal issue detected"}
-        elif any(word in text_lower for word in ['headache', 'migraine', 'seizure', 'neurological', 'neurology', 'memory', 'stroke', 'epilepsy', 'brain']):
-            result = {"specialty": "Neurology", "urgency": "High", "summary": "Neurological symptoms detected"}
-        elif any(word in text_lower for word in ['stomach', 'abdominal', 'digestive', 'bowel', 'nausea', 'gastro', 'gastroenterology', 'intestine', 'diarrhea', 'constipation']):
-            result = {"specialty": "Gastroenterology", "urgency": "Medium", "summary": "Digestive system issue detected"}
-        elif any(word in text_lower for word in ['diabetes', 'thyroid', 'hormone', 'endocrine', 'endocrinology', 'insulin', 'glucose', 'metabolic']):
-            result = {"specialty": "Endocrinology", "urgency": "Medium", "summary": "Endocrine condition detected"}
-        elif any(word in text_lower for word in ['breathing', 'cough', 'lung', 'asthma', 'respiratory', 'pulmonology', 'bronchitis', 'pneumonia', 'copd']):
-            result = {"specialty": "Pulmonology", "urgency": "High", "summary": "Respiratory symptoms detected"}
-        elif any(word in text_lower for word in ['eye', 'vision', 'sight', 'blurry', 'ophthalmology', 'ophthalmologist', 'cataract', 'glaucoma', 'retina']):
-            result = {"specialty": "Ophthalmology", "urgency": "Medium", "summary": "Eye/vision issue detected"}
-        elif any(word in text_lower for word in ['anxiety', 'depression', 'mental', 'psychiatric', 'psychiatry', 'stress', 'bipolar', 'schizophrenia', 'therapy']):
-            result = {"specialty": "Psychiatry", "urgency": "Medium", "summary": "Mental health concern detected"}
-        elif any(word in text_lower for word in ['urinary', 'bladder', 'kidney', 'urology', 'urologist', 'prostate', 'uti', 'incontinence']):
-            result = {"specialty": "Urology", "urgency": "Medium", "summary": "Urological issue detected"}
-        elif any(word in text_lower for word in ['pregnancy', 'menstrual', 'gynecology', 'gynecologist', 'ovarian', 'uterus', 'pelvic', 'cervical', 'obstetric']):
-            result = {"specialty": "Gynecology", "urgency": "Medium", "summary": "Gynecological concern detected"}
-        else:
-            result = {"specialty": "General Medicine", "urgency": "Medium", "summary": "General medical consultation needed"}
-        
-        print(f"[Rule-based Analysis] Result: {result}\n")
+        # Score every specialty in one pass over the text
+        with METRICS.timer("rule_analysis"):
+            result = RULE_CLASSIFIER.classify(text)
+        logger.debug("Rule-based analysis of %r: %s", text[:100], result)
         return result
     
     def _parse_response(self, text):
@@ -137,18 +416,9 @@ SUMMARY: [brief summary]"""
         result = {"specialty": "", "urgency": "", "summary": ""}
         
         for line in lines:
-            if "SPECIALTY:" in line:
-                specialty = line.split("SPECIALTY:")[-1].strip()
-                # Remove markdown formatting
-                specialty = specialty.replace("**", "").replace("*", "").strip()
-                result["specialty"] = specialty
-            elif "URGENCY:" in line:
-                urgency = line.split("URGENCY:")[-1].strip()
-                urgency = urgency.replace("**", "").replace("*", "").strip()
-                result["urgency"] = urgency
-            elif "SUMMARY:" in line:
-                summary = line.split("SUMMARY:")[-1].strip()
-                summary = summary.replace("**", "").replace("*", "").strip()
-                result["summary"] = summary
+            parsed = parse_line(line)
+            if parsed:
+                field, value = parsed
+                result[field] = value
         
         return result
@@ -0,0 +1,258 @@
+import cProfile
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Histogram bucket upper bounds in seconds (Prometheus "le" labels)
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class _NullTimer:
+    """Shared do-nothing timer handed out while metrics are disabled"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class _Timer:
+    def __init__(self, metrics, stage):
+        self.metrics = metrics
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metrics.observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+class _Histogram:
+    def __init__(self, buckets):
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+
+class Metrics:
+    """Process-wide stage timers, counters and latency histograms.
+
+    Disabled by default: timer() then returns a shared no-op context manager
+    and count()/observe() return immediately, so instrumented hot paths pay
+    one attribute check. Enabled metrics can be rendered in the Prometheus
+    text format, served over HTTP or written to a file.
+    """
+
+    def __init__(self, enabled=False, buckets=DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._histograms = {}
+        self._counters = {}
+        self._server = None
+        self._writer = None
+        # Slow-request profiling, see profile()
+        self.profile_dir = None
+        self.profile_rate = 0.0
+        self.profile_slow_ms = 1000.0
+        self._profile_lock = threading.Lock()
+
+    def timer(self, stage):
+        """Context manager recording the block's duration under stage"""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, stage)
+
+    def observe(self, stage, seconds):
+        if not self.enabled:
+            return
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = _Histogram(self.buckets)
+            histogram.counts[index] += 1
+            histogram.sum += seconds
+            histogram.count += 1
+
+    def count(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def snapshot(self):
+        """Plain-dict view: {"stages": {stage: {count, sum_seconds, mean_ms}}, "counters": {...}}"""
+        with self._lock:
+            stages = {
+                stage: {
+                    "count": h.count,
+                    "sum_seconds": h.sum,
+                    "mean_ms": h.sum / h.count * 1000 if h.count else 0.0,
+                }
+                for stage, h in self._histograms.items()
+            }
+            counters = {_series(name, labels): value for (name, labels), value in self._counters.items()}
+        return {"stages": stages, "counters": counters}
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+            self._counters.clear()
+
+    def render_prometheus(self, prefix="medical_analyzer"):
+        lines = []
+        with self._lock:
+            if self._histograms:
+                name = f"{prefix}_stage_seconds"
+                lines.append(f"# HELP {name} Time spent per pipeline stage")
+                lines.append(f"# TYPE {name} histogram")
+                for stage, h in sorted(self._histograms.items()):
+                    stage = _label_value(stage)
+                    cumulative = 0
+                    for bound, count in zip(self.buckets + (float("inf"),), h.counts):
+                        cumulative += count
+                        le = "+Inf" if bound == float("inf") else repr(bound)
+                        lines.append(f'{name}_bucket{{stage="{stage}",le="{le}"}} {cumulative}')
+                    lines.append(f'{name}_sum{{stage="{stage}"}} {h.sum}')
+                    lines.append(f'{name}_count{{stage="{stage}"}} {h.count}')
+            seen = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                metric = f"{prefix}_{name}_total"
+                if metric not in seen:
+                    seen.add(metric)
+                    lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{_series(metric, labels)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write the Prometheus text to path atomically (node_exporter textfile style)"""
+        with open(path + ".tmp", "w") as f:
+            f.write(self.render_prometheus())
+        os.replace(path + ".tmp", path)
+
+    def serve(self, port, host="127.0.0.1"):
+        """Serve GET /metrics from a daemon thread; a second call is a no-op"""
+        if self._server is not None:
+            return self._server
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = metrics.render_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=self._server.serve_forever, name="metrics-http", daemon=True).start()
+        return self._server
+
+    def write_periodically(self, path, interval=15.0):
+        """Rewrite path every interval seconds from a daemon thread"""
+        if self._writer is not None:
+            return
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                self.write(path)
+
+        self._writer = threading.Thread(target=loop, name="metrics-file", daemon=True)
+        self._writer.start()
+
+    def profile(self, name):
+        """Context manager that cProfiles a sample of requests and keeps the slow ones.
+
+        A profile_rate fraction of calls run under cProfile; if the request
+        takes longer than profile_slow_ms its stats are dumped to
+        profile_dir/<name>-<timestamp>.prof (open with pstats or snakeviz).
+        Only one request is profiled at a time. Does nothing unless
+        profile_dir is set. For whole-process sampling, py-spy can attach
+        to the running process instead; stage timers add no wrapper frames.
+        """
+        if self.profile_dir is None or random.random() >= self.profile_rate:
+            return _NULL_TIMER
+        return _ProfiledRequest(self, name)
+
+
+class _ProfiledRequest:
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+        self.profiler = None
+
+    def __enter__(self):
+        # cProfile allows one active profiler; skip rather than wait
+        if self.metrics._profile_lock.acquire(blocking=False):
+            self.profiler = cProfile.Profile()
+            self.start = time.perf_counter()
+            self.profiler.enable()
+        return self
+
+    def __exit__(self, *exc):
+        if self.profiler is None:
+            return False
+        self.profiler.disable()
+        self.metrics._profile_lock.release()
+        elapsed_ms = (time.perf_counter() - self.start) * 1000
+        if elapsed_ms >= self.metrics.profile_slow_ms:
+            os.makedirs(self.metrics.profile_dir, exist_ok=True)
+            path = os.path.join(self.metrics.profile_dir, f"{self.name}-{time.time_ns()}.prof")
+            self.profiler.dump_stats(path)
+            self.metrics.count("slow_requests_profiled", request=self.name)
+        return False
+
+
+def _series(name, labels):
+    if not labels:
+        return name
+    return name + "{" + ",".join(f'{key}="{_label_value(value)}"' for key, value in labels) + "}"
+
+
+def _label_value(value):
+    """Escape a label value for the Prometheus text format (sanitizer patterns can hold anything)"""
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def configure_from_env(metrics=None):
+    """Apply METRICS_* environment settings and start any exporters they ask for"""
+    metrics = metrics or METRICS
+    # Configuring an exporter implies collecting something to export
+    if _env_flag("METRICS_ENABLED") or os.getenv("METRICS_PORT") or os.getenv("METRICS_FILE"):
+        metrics.enabled = True
+    if os.getenv("METRICS_PORT"):
+        metrics.serve(int(os.getenv("METRICS_PORT")))
+    if os.getenv("METRICS_FILE"):
+        metrics.write_periodically(os.getenv("METRICS_FILE"), float(os.getenv("METRICS_FILE_INTERVAL", "15")))
+    if os.getenv("METRICS_PROFILE_DIR"):
+        metrics.profile_dir = os.getenv("METRICS_PROFILE_DIR")
+        metrics.profile_rate = float(os.getenv("METRICS_PROFILE_RATE", "0.01"))
+        metrics.profile_slow_ms = float(os.getenv("METRICS_PROFILE_SLOW_MS", "1000"))
+    return metrics
+
+
+def _env_flag(name):
+    return os.getenv(name, "").lower() in ("1", "true", "yes")
+
+
+METRICS = Metrics(enabled=_env_flag("METRICS_ENABLED"))
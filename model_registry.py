@@ -0,0 +1,150 @@
+import os
+import threading
+import time
+
+from analysis_cache import AnalysisCache
+from doctor_directory import DoctorDirectory
+from doctor_matcher import DoctorMatcher
+from document_processor import DocumentProcessor
+from extraction_cache import ExtractionCache
+from medical_analyzer import MedicalAnalyzer, DEFAULT_MODEL, MAX_INPUT_CHARS, RULES_ONLY
+from pipeline import AnalysisPipeline
+
+
+def resident_memory_mb():
+    """Current resident set size of this process in MB, or None where it cannot be read"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        # Windows has neither procfs nor resource
+        return None
+    # No procfs (macOS): fall back to peak RSS, reported in bytes there
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (1024 * 1024)
+
+
+class ModelRegistry:
+    """Process-wide owner of the shared analyzer, matcher and processor.
+
+    The model is loaded at most once per process, lazily on first use. By
+    default loading runs in a background thread; until it finishes the
+    analyzer answers with the rule engine.
+    """
+
+    NOT_LOADED = "not_loaded"
+    LOADING = "loading"
+    READY = "ready"
+    FAILED = "failed"
+
+    def __init__(self, model_name=DEFAULT_MODEL, cache_path=None, doctor_source=None, doctor_snapshot_dir=None,
+                 pipeline_workers=4, pipeline_max_pending=32, extraction_cache_path=None):
+        self.model_name = model_name
+        self.pipeline_workers = pipeline_workers
+        self.pipeline_max_pending = pipeline_max_pending
+        self.cache_path = cache_path
+        self.extraction_cache_path = extraction_cache_path
+        self.doctor_source = doctor_source
+        self.doctor_snapshot_dir = doctor_snapshot_dir
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._analyzer = None
+        self._matcher = None
+        self._processor = None
+        self._pipeline = None
+        self._state = self.NOT_LOADED
+        self._load_seconds = None
+        self._memory_before_mb = None
+        self._memory_after_mb = None
+
+    def get_analyzer(self, background=True):
+        with self._lock:
+            if self._analyzer is None:
+                cache = AnalysisCache(path=self.cache_path)
+                self._analyzer = MedicalAnalyzer(self.model_name, cache=cache, load_model=False)
+            # In rules-only mode the model is never loaded (nor torch imported)
+            start_loading = self._state == self.NOT_LOADED and not RULES_ONLY
+            if start_loading:
+                self._state = self.LOADING
+
+        if start_loading:
+            if background:
+                threading.Thread(target=self._load, name="model-warmup", daemon=True).start()
+            else:
+                self._load()
+        return self._analyzer
+
+    def get_matcher(self):
+        with self._lock:
+            if self._matcher is None:
+                directory = None
+                if self.doctor_source:
+                    directory = DoctorDirectory.from_source(self.doctor_source, self.doctor_snapshot_dir)
+                self._matcher = DoctorMatcher(directory)
+            return self._matcher
+
+    def get_processor(self):
+        with self._lock:
+            if self._processor is None:
+                self._processor = DocumentProcessor(ExtractionCache(path=self.extraction_cache_path))
+            return self._processor
+
+    def get_pipeline(self):
+        analyzer = self.get_analyzer()
+        matcher = self.get_matcher()
+        processor = self.get_processor()
+        with self._lock:
+            if self._pipeline is None:
+                self._pipeline = AnalysisPipeline(
+                    analyzer, matcher, processor,
+                    max_workers=self.pipeline_workers,
+                    max_pending=self.pipeline_max_pending,
+                    # Extraction stops once the analyzer's input limit is covered
+                    max_chars=MAX_INPUT_CHARS,
+                )
+            return self._pipeline
+
+    def _load(self):
+        self._memory_before_mb = resident_memory_mb()
+        start = time.perf_counter()
+        loaded = self._analyzer.load_model()
+        with self._lock:
+            self._load_seconds = time.perf_counter() - start
+            self._memory_after_mb = resident_memory_mb()
+            self._state = self.READY if loaded else self.FAILED
+        self._ready.set()
+
+    def wait_until_ready(self, timeout=None):
+        """Block until loading has finished; True if the model is usable"""
+        self._ready.wait(timeout)
+        return self._state == self.READY
+
+    def status(self):
+        with self._lock:
+            model_memory = None
+            if self._memory_after_mb is not None and self._memory_before_mb is not None:
+                model_memory = self._memory_after_mb - self._memory_before_mb
+            return {
+                "state": self._state,
+                "model": self.model_name,
+                "engine": "model" if self._state == self.READY else "rules",
+                "load_seconds": self._load_seconds,
+                "model_memory_mb": model_memory,
+                "resident_memory_mb": resident_memory_mb(),
+                "error": self._analyzer.load_error if self._analyzer else None,
+            }
+
+
+REGISTRY = ModelRegistry(
+    cache_path=os.getenv("ANALYSIS_CACHE_PATH"),
+    doctor_source=os.getenv("DOCTOR_DIRECTORY"),
+    doctor_snapshot_dir=os.getenv("DOCTOR_SNAPSHOT_DIR"),
+    pipeline_workers=int(os.getenv("PIPELINE_WORKERS", "4")),
+    pipeline_max_pending=int(os.getenv("PIPELINE_MAX_PENDING", "32")),
+    extraction_cache_path=os.getenv("EXTRACTION_CACHE_PATH"),
+)
+
@@ -0,0 +1,180 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+from batch_queue import MicroBatcher
+from metrics import METRICS
+
+STAGES = ("extraction", "analysis", "matching")
+
+# Uploads that extract to less than this are failed rather than analyzed
+MIN_EXTRACTED_CHARS = 10
+
+
+class PipelineBusy(RuntimeError):
+    """Raised by submit() when the pipeline already holds max_pending jobs"""
+
+
+class Job:
+    def __init__(self, text, file, price_preference):
+        self.id = uuid.uuid4().hex
+        self.text = text
+        self.file = file
+        self.price_preference = price_preference
+        self.status = "queued"
+        self.stage = None
+        self.partial = None
+        self.analysis = None
+        self.doctors = None
+        self.error = None
+        self.timings = {}
+        self.submitted = time.perf_counter()
+        self.done = threading.Event()
+
+    def update_partial(self, partial):
+        self.partial = partial
+
+    def snapshot(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "stage": self.stage,
+            "partial": self.partial,
+            "text": self.text,
+            "analysis": self.analysis,
+            "doctors": self.doctors,
+            "error": self.error,
+            "timings": dict(self.timings),
+        }
+
+
+class AnalysisPipeline:
+    """Runs extraction -> analysis -> matching as jobs on a bounded worker pool.
+
+    submit() returns a job id straight away; poll() returns whatever stages
+    have finished so far, plus any partially generated fields, so callers
+    can show the specialty before the doctors arrive. At most max_pending
+    jobs may be queued or running; beyond that submit() raises PipelineBusy.
+    Uploads are extracted on the workers (up to max_chars), so one job's
+    extraction overlaps with others' analysis. Analyses go through a
+    MicroBatcher (by default one over analyzer, closed with the pipeline):
+    jobs reaching the model together share one generate call instead of
+    queueing for it.
+    """
+
+    def __init__(self, analyzer, matcher, processor, max_workers=4, max_pending=32, max_finished=1000,
+                 batcher=None, max_chars=None):
+        self.analyzer = analyzer
+        self.matcher = matcher
+        self.processor = processor
+        self.max_pending = max_pending
+        self.max_finished = max_finished
+        self.max_chars = max_chars
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="pipeline")
+        self._owns_batcher = batcher is None
+        # Only max_workers jobs can be analyzing at once, so no batch is larger
+        self.batcher = batcher or MicroBatcher(analyzer, max_batch_size=max_workers)
+        self._lock = threading.Lock()
+        self._jobs = OrderedDict()
+        self._pending = 0
+        self._running = 0
+        self._latencies = {stage: deque(maxlen=500) for stage in STAGES + ("queue", "total")}
+
+    def submit(self, text=None, file=None, price_preference="medium"):
+        if text is None and file is None:
+            raise ValueError("submit() needs text or a file")
+        job = Job(text, file, price_preference)
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise PipelineBusy(f"{self._pending} jobs already pending")
+            self._pending += 1
+            self._jobs[job.id] = job
+            self._forget_finished()
+        self._executor.submit(self._run, job)
+        return job.id
+
+    def poll(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return job.snapshot() if job else None
+
+    def result(self, job_id, timeout=None):
+        """Wait for a job to finish and return its final snapshot"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        job.done.wait(timeout)
+        return self.poll(job_id)
+
+    def stats(self):
+        with self._lock:
+            latencies = {}
+            for stage, samples in self._latencies.items():
+                if samples:
+                    ordered = sorted(samples)
+                    latencies[stage] = {
+                        "count": len(ordered),
+                        "mean_ms": sum(ordered) / len(ordered) * 1000,
+                        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] * 1000,
+                    }
+            return {
+                "queue_depth": self._pending - self._running,
+                "running": self._running,
+                "max_pending": self.max_pending,
+                "latency": latencies,
+            }
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+        if self._owns_batcher:
+            self.batcher.close()
+
+    def _run(self, job):
+        with self._lock:
+            self._running += 1
+            job.status = "running"
+            self._record(job, "queue", time.perf_counter() - job.submitted)
+        try:
+            with METRICS.profile("job"):
+                self._run_stages(job)
+            job.status = "done"
+        except Exception as e:
+            job.error = str(e)
+            job.status = "failed"
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._pending -= 1
+                job.stage = None
+                self._record(job, "total", time.perf_counter() - job.submitted)
+            job.done.set()
+
+    def _run_stages(self, job):
+        if job.text is None:
+            job.text = self._stage(job, "extraction", self.processor.extract_text, job.file, self.max_chars)
+            if len(job.text.strip()) < MIN_EXTRACTED_CHARS:
+                raise ValueError("Could not extract text from document. Please try another file.")
+        # Partial fields stream into the job while the model writes them
+        job.analysis = self._stage(job, "analysis", self.batcher.analyze_symptoms, job.text, job.update_partial)
+        job.doctors = self._stage(
+            job, "matching", self.matcher.find_doctors, job.analysis["specialty"], job.price_preference)
+
+    def _stage(self, job, stage, func, *args):
+        job.stage = stage
+        start = time.perf_counter()
+        result = func(*args)
+        with self._lock:
+            self._record(job, stage, time.perf_counter() - start)
+        return result
+
+    def _record(self, job, stage, seconds):
+        job.timings[stage] = seconds
+        self._latencies[stage].append(seconds)
+
+    def _forget_finished(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.done.is_set()]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
@@ -0,0 +1,92 @@
+import time
+
+# Response markers in the order the prompt asks for them
+FIELDS = (("SPECIALTY:", "specialty"), ("URGENCY:", "urgency"), ("SUMMARY:", "summary"))
+
+
+def parse_line(line):
+    """Return (field, value) for a SPECIALTY/URGENCY/SUMMARY line, else None"""
+    for marker, field in FIELDS:
+        if marker in line:
+            value = line.split(marker)[-1].strip()
+            # Remove markdown formatting
+            value = value.replace("**", "").replace("*", "").strip()
+            return field, value
+    return None
+
+
+class StreamingResponseParser:
+    """Parses the three-line answer format while tokens are being generated.
+
+    Only the tokens of the line in progress are decoded on each step, never
+    the prompt. A field counts as complete once its line ends; on_update, if
+    given, is called with the partial result whenever it changes, which lets
+    the UI stream the summary as it is written.
+    """
+
+    def __init__(self, tokenizer, on_update=None):
+        self.tokenizer = tokenizer
+        self.on_update = on_update
+        self.result = {"specialty": "", "urgency": "", "summary": ""}
+        self.completed = set()
+        self.tokens = 0
+        self.started = time.perf_counter()
+        self.first_field_seconds = None
+        self._line_tokens = []
+
+    @property
+    def complete(self):
+        return len(self.completed) == len(FIELDS)
+
+    def feed(self, token_id):
+        self.tokens += 1
+        self._line_tokens.append(token_id)
+        text = self.tokenizer.decode(self._line_tokens, skip_special_tokens=True)
+        *finished, current = text.split("\n")
+        for line in finished:
+            self._parse(line, final=True)
+        if text.endswith("\n"):
+            self._line_tokens = []
+        elif current:
+            self._parse(current, final=False)
+
+    def finish(self):
+        """Treat whatever is left as a complete line (generation has ended)"""
+        if self._line_tokens:
+            text = self.tokenizer.decode(self._line_tokens, skip_special_tokens=True)
+            for line in text.split("\n"):
+                self._parse(line, final=True)
+            self._line_tokens = []
+
+    def _parse(self, line, final):
+        parsed = parse_line(line)
+        if parsed is None:
+            return
+        field, value = parsed
+        changed = self.result[field] != value
+        self.result[field] = value
+        if final and value and field not in self.completed:
+            self.completed.add(field)
+            if self.first_field_seconds is None:
+                self.first_field_seconds = time.perf_counter() - self.started
+        if changed and self.on_update:
+            self.on_update(dict(self.result))
+
+
+class FieldsCompleteCriteria:
+    """Stops generation for each row once its parser has all three fields.
+
+    Implements transformers' StoppingCriteria call signature without
+    subclassing it, so importing this module does not import transformers.
+    """
+
+    def __init__(self, parsers):
+        self.parsers = parsers
+
+    def __call__(self, input_ids, scores, **kwargs):
+        # Called once per step with the newest token in the last column
+        new_tokens = input_ids[:, -1].tolist()
+        for parser, token_id in zip(self.parsers, new_tokens):
+            if not parser.complete:
+                parser.feed(token_id)
+        return input_ids.new_tensor([parser.complete for parser in self.parsers]).bool()
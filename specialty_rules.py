@@ -0,0 +1,108 @@
+import re
+from collections import Counter
+
+# Ordered keyword table for the rule-based engine. Order is the tie-breaker:
+# when two specialties score the same, the one listed first wins, as in the
+# old if/elif chain. Unlike that chain's substring test, keywords only match
+# at the start of a word ("heart" fires in "heartbeat", not "sweetheart").
+SPECIALTY_RULES = [
+    ("Dentistry", "Low", "Dental issue detected",
+     ['tooth', 'teeth', 'dental', 'dentist', 'gum', 'cavity', 'toothache', 'molar', 'filling', 'crown', 'root canal']),
+    ("Cardiology", "High", "Cardiovascular symptoms detected",
+     ['chest pain', 'heart', 'cardiac', 'cardiology', 'blood pressure', 'palpitation', 'cardiovascular', 'angina']),
+    ("Dermatology", "Low", "Skin condition detected",
+     ['rash', 'skin', 'itch', 'acne', 'dermatitis', 'dermatology', 'eczema', 'psoriasis', 'melanoma']),
+    ("Orthopedics", "Medium", "Musculoskeletal issue detected",
+     ['back pain', 'joint', 'bone', 'fracture', 'orthopedic', 'orthopedics', 'spine', 'arthritis', 'ligament']),
+    ("Neurology", "High", "Neurological symptoms detected",
+     ['headache', 'migraine', 'seizure', 'neurological', 'neurology', 'memory', 'stroke', 'epilepsy', 'brain']),
+    ("Gastroenterology", "Medium", "Digestive system issue detected",
+     ['stomach', 'abdominal', 'digestive', 'bowel', 'nausea', 'gastro', 'gastroenterology', 'intestine', 'diarrhea', 'constipation']),
+    ("Endocrinology", "Medium", "Endocrine condition detected",
+     ['diabetes', 'thyroid', 'hormone', 'endocrine', 'endocrinology', 'insulin', 'glucose', 'metabolic']),
+    ("Pulmonology", "High", "Respiratory symptoms detected",
+     ['breathing', 'cough', 'lung', 'asthma', 'respiratory', 'pulmonology', 'bronchitis', 'pneumonia', 'copd']),
+    ("Ophthalmology", "Medium", "Eye/vision issue detected",
+     ['eye', 'vision', 'sight', 'blurry', 'ophthalmology', 'ophthalmologist', 'cataract', 'glaucoma', 'retina']),
+    ("Psychiatry", "Medium", "Mental health concern detected",
+     ['anxiety', 'depression', 'mental', 'psychiatric', 'psychiatry', 'stress', 'bipolar', 'schizophrenia', 'therapy']),
+    ("Urology", "Medium", "Urological issue detected",
+     ['urinary', 'bladder', 'kidney', 'urology', 'urologist', 'prostate', 'uti', 'incontinence']),
+    ("Gynecology", "Medium", "Gynecological concern detected",
+     ['pregnancy', 'menstrual', 'gynecology', 'gynecologist', 'ovarian', 'uterus', 'pelvic', 'cervical', 'obstetric']),
+]
+
+DEFAULT_RESULT = {"specialty": "General Medicine", "urgency": "Medium", "summary": "General medical consultation needed"}
+
+
+def trie_pattern(words):
+    """Build a regex alternation shaped like a trie of the given words"""
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = True
+
+    def build(node):
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        # A word ending here makes the rest optional; greedy matching still
+        # prefers the longer keyword ("gastroenterology" over "gastro").
+        return "(?:" + body + ")?" if "" in node else body
+
+    return build(trie)
+
+
+def _is_word_end(text, pos):
+    """True if pos ends a word, allowing a trailing plural "s" """
+    if pos < len(text) and text[pos] == "s":
+        pos += 1
+    return pos >= len(text) or not text[pos].isalnum()
+
+
+class KeywordClassifier:
+    """Single-pass keyword classifier compiled once from SPECIALTY_RULES"""
+
+    def __init__(self, rules=SPECIALTY_RULES):
+        self.rules = {specialty: (urgency, summary) for specialty, urgency, summary, _ in rules}
+        self.priority = {specialty: i for i, (specialty, _, _, _) in enumerate(rules)}
+        self.keyword_to_specialty = {}
+        for specialty, _, _, keywords in rules:
+            for word in keywords:
+                self.keyword_to_specialty.setdefault(word, specialty)
+
+        # All keywords are folded into one trie-shaped regex so the engine
+        # branches on each character instead of retrying every alternative.
+        # Keywords start on a word boundary; very short ones ("gum", "uti",
+        # "eye") are also checked for a word end so they don't fire inside
+        # other words.
+        self.pattern = re.compile(r"\b(" + trie_pattern(self.keyword_to_specialty) + ")")
+
+    def score(self, text):
+        """Return a {specialty: keyword hits} mapping for the text"""
+        text_lower = text.lower()
+        scores = Counter()
+        for match in self.pattern.finditer(text_lower):
+            word = match.group(1)
+            if len(word) <= 3 and not _is_word_end(text_lower, match.end()):
+                continue
+            scores[self.keyword_to_specialty[word]] += 1
+        return dict(scores)
+
+    def classify(self, text):
+        scores = self.score(text)
+        if not scores:
+            return dict(DEFAULT_RESULT)
+
+        specialty = max(scores, key=lambda s: (scores[s], -self.priority[s]))
+        urgency, summary = self.rules[specialty]
+        return {"specialty": specialty, "urgency": urgency, "summary": summary}
+
+    def analyze_many(self, texts):
+        return [self.classify(text) for text in texts]
+
+
+RULE_CLASSIFIER = KeywordClassifier()